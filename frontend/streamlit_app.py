@@ -486,9 +486,6 @@ def show_learning_path():
         st.info("💡 **To get started:**\n1. Go to **Integrations** and connect your data sources\n2. Or upload content in **Knowledge Base**\n3. Then return here to create your learning path!")
         return
     
-    # Show session-only notice
-    st.info("💡 **Note:** Flashcard sets are session-only and will be cleared when you restart the app.")
-    
     # Only show Create Flashcards section
     show_create_flashcards()
 
@@ -551,40 +548,62 @@ def generate_flashcards_simplified(count):
     except Exception as e:
         st.error(f"❌ Error generating flashcards: {e}")
 
+def fetch_flashcard_sets():
+    """Get every flashcard set summary, following the pagination cursor (None if the request fails)"""
+    sets = []
+    cursor = None
+    while True:
+        params = {"limit": 100}
+        if cursor:
+            params["cursor"] = cursor
+        response = requests.get(f"{API_BASE}/flashcard-sets", params=params)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        sets.extend(data.get('sets', []))
+        cursor = data.get('next_cursor')
+        if not cursor:
+            return sets
+
+def fetch_flashcard_set_cards(set_id):
+    """Get the cards of a flashcard set (summaries do not include them)"""
+    try:
+        response = requests.get(f"{API_BASE}/flashcard-sets/{set_id}")
+        if response.status_code == 200:
+            return response.json().get('flashcard_set', {}).get('flashcards', [])
+        return []
+    except:
+        return []
+
 def get_flashcard_sets():
     """Get available flashcard sets"""
     try:
-        response = requests.get(f"{API_BASE}/flashcard-sets")
-        if response.status_code == 200:
-            sets = response.json().get('sets', [])
-            return [f"{s['name']} ({s['card_count']} cards)" for s in sets]
-        else:
-            return []
+        sets = fetch_flashcard_sets() or []
+        return [f"{s['name']} ({s['card_count']} cards)" for s in sets]
     except:
         return []
 
 def show_existing_flashcards():
     """Show existing flashcard sets with simplified display"""
     try:
-        response = requests.get(f"{API_BASE}/flashcard-sets")
-        if response.status_code == 200:
-            sets = response.json().get('sets', [])
-            
+        sets = fetch_flashcard_sets()
+        if sets is not None:
             if not sets:
                 st.info("📭 No flashcard sets created yet. Generate your first set above!")
-                st.info("💡 **Note:** Flashcard sets are session-only and will be cleared when you restart the app.")
                 return
             
             st.subheader(f"📚 Your Flashcard Sets ({len(sets)} total)")
-            st.info("💡 **Note:** Flashcard sets are session-only and will be cleared when you restart the app.")
             
             for flashcard_set in sets:
                 with st.expander(f"📋 {flashcard_set['name']} ({flashcard_set['card_count']} cards)"):
                     # Basic set information
                     st.write(f"**📅 Created:** {flashcard_set.get('created_date', 'Unknown')}")
                     
-                    # Show sample cards if available
-                    cards = flashcard_set.get('cards', [])
+                    # Cards are fetched only when asked for, once per set per session
+                    cached_cards = st.session_state.setdefault('flashcard_set_cards', {})
+                    cards = cached_cards.get(flashcard_set['id'])
+                    if cards is None and st.button("📄 Show Sample Cards", key=f"preview_{flashcard_set['id']}"):
+                        cards = cached_cards[flashcard_set['id']] = fetch_flashcard_set_cards(flashcard_set['id'])
                     if cards:
                         st.write("**📄 Sample Cards:**")
                         for i, card in enumerate(cards[:3]):  # Show first 3
@@ -606,6 +625,7 @@ def delete_flashcard_set(set_id):
     try:
         response = requests.delete(f"{API_BASE}/flashcard-sets/{set_id}")
         if response.status_code == 200:
+            st.session_state.get('flashcard_set_cards', {}).pop(set_id, None)
             st.success("✅ Flashcard set deleted!")
             st.rerun()
         else:
@@ -52,6 +52,7 @@ def main():
     print("   • POST /ingest - Upload text content")
     print("   • POST /ingest/file - Upload file")
     print("   • POST /search - Search knowledge base")
+    print("   • POST /search/batch - Batched multi-query search")
     print("   • POST /ask - Ask questions")
     print("   • POST /integrate/github - GitHub integration")
     print("   • POST /integrate/notion - Notion integration")
@@ -5,7 +5,7 @@ app = Flask(__name__)
 CORS(app)
 
 # Register blueprints
-from routes.ingest import ingest_bp
+from routes.ingest import ingest_bp, UPLOAD_MAX_BYTES
 from routes.search import search_bp
 from routes.ask import ask_bp
 from routes.health import health_bp
@@ -23,5 +23,8 @@ app.register_blueprint(activities_bp)
 app.register_blueprint(flashcards_bp)
 app.register_blueprint(tokens_bp)
 
+# Reject request bodies larger than the upload cap (plus form overhead) before they are read
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES + 1024 * 1024
+
 if __name__ == "__main__":
     app.run(debug=True)
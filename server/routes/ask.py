@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 import logging
-from utils.openai_utils import get_embedding, client
-from utils.pinecone_utils import query_chunks, check_index_health
+from utils.llm_provider import get_embedding, chat_completion
+from utils.pinecone_utils import query_chunks, check_index_health, namespaces_for_integrations
+from utils.context_builder import build_context
+from utils.prompt_compression import compress_texts, COMPRESSION_METHODS
 from utils.activity_tracker import log_qa_activity
 
 ask_bp = Blueprint('ask', __name__)
@@ -13,10 +15,23 @@ def ask():
     question = data.get("question", "")
     top_k = data.get("top_k", 5)
     metadata_filter = data.get("filter", None)
+    mmr = data.get("mmr", False)
+    mmr_lambda = data.get("mmr_lambda", 0.5)
+    namespaces = namespaces_for_integrations(data.get("integrations"))
+    context_tokens = data.get("context_tokens", None)
+    expand_neighbors = data.get("expand_neighbors", True)
+    compression = data.get("compression", False)
+    compression_ratio = data.get("compression_ratio", None)
 
     if not question:
         return jsonify({"error": "Missing question parameter"}), 400
 
+    # compression is false, true (embedding scoring) or a method name
+    if compression is True:
+        compression = "embedding"
+    if compression and compression not in COMPRESSION_METHODS:
+        return jsonify({"error": f"Unknown compression method: {compression}"}), 400
+
     try:
         # First check if Pinecone index is healthy
         if not check_index_health():
@@ -31,10 +46,21 @@ def ask():
         
         # Search for relevant context with retry logic
         logger.info(f"Searching for {top_k} relevant chunks...")
-        results = query_chunks(question_embedding, top_k=top_k, metadata_filter=metadata_filter)
+        results = query_chunks(question_embedding, top_k=top_k, metadata_filter=metadata_filter,
+                               mmr=mmr, mmr_lambda=mmr_lambda, namespaces=namespaces)
+        
+        # Pack retrieved chunks (and their neighbors) into the context token budget
+        packed = build_context(results.matches, token_budget=context_tokens,
+                               expand_neighbors=expand_neighbors)
+        context = packed["context"]
         
-        # Build context from retrieved chunks
-        context = "\n\n".join([match.metadata.get("text", "") for match in results.matches])
+        # Optionally keep only the sentences most relevant to the question
+        compression_stats = None
+        if compression:
+            compressed = compress_texts(packed["texts"], question, question_embedding,
+                                        ratio=compression_ratio, method=compression)
+            context = "\n\n".join(text for text in compressed["texts"] if text)
+            compression_stats = {key: compressed[key] for key in ("method", "original_tokens", "compressed_tokens")}
         
         # Create prompt for OpenAI
         prompt = f"""Based on the following context, please answer the question. If the context doesn't contain enough information to answer the question, say so.
@@ -46,11 +72,10 @@ Question: {question}
 
 Answer:"""
         
-        # Get answer from OpenAI
-        logger.info("Generating answer with OpenAI...")
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
+        # Get answer from the configured LLM provider
+        logger.info("Generating answer...")
+        answer = chat_completion(
+            [
                 {"role": "system", "content": "You are a helpful assistant that answers questions based on the provided context."},
                 {"role": "user", "content": prompt}
             ],
@@ -58,8 +83,6 @@ Answer:"""
             temperature=0.7
         )
         
-        answer = response.choices[0].message.content
-        
         # Format sources
         sources = []
         for match in results.matches:
@@ -79,7 +102,11 @@ Answer:"""
             "question": question,
             "answer": answer,
             "sources": sources,
-            "context_used": len(results.matches)
+            "context_used": packed["chunks_packed"],
+            "context_tokens": packed["tokens"],
+            "context_token_budget": packed["token_budget"],
+            "neighbors_added": packed["neighbors_added"],
+            "compression": compression_stats
         })
         
     except Exception as e:
@@ -2,23 +2,79 @@ from flask import Blueprint, request, jsonify
 import logging
 import json
 import os
-import uuid
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from utils.openai_utils import client, get_embedding
+from utils.llm_provider import chat_completion
 from utils.pinecone_utils import query_chunks, check_index_health
+from utils.prompt_compression import compress_batch, COMPRESSION_METHODS
+from utils.context_builder import estimate_tokens
+from utils.query_embeddings import query_embeddings
+from utils.flashcard_topics import flashcard_topics
+from utils.content_sampler import content_sampler, chunk_key
+from utils.flashcard_pool import flashcard_pool
+from utils.flashcard_store import (
+    flashcard_store, CardNotFoundError, FLASHCARD_SETS_PAGE_SIZE, DUE_CARDS_BATCH_SIZE, STUDY_MODES
+)
+from utils.spaced_repetition import PASSING_QUALITY
 from utils.activity_tracker import log_system_activity
 
 flashcards_bp = Blueprint('flashcards', __name__)
 logger = logging.getLogger(__name__)
 
-# In-memory storage for current session only (no file persistence)
-current_flashcard_sets = []
+# Concurrent vector queries, card generation workers and per-request deadline
+FLASHCARD_QUERY_CONCURRENCY = int(os.getenv("FLASHCARD_QUERY_CONCURRENCY", 6))
+FLASHCARD_GENERATION_WORKERS = int(os.getenv("FLASHCARD_GENERATION_WORKERS", 8))
+FLASHCARD_DEADLINE_SECONDS = float(os.getenv("FLASHCARD_DEADLINE_SECONDS", 30))
+
+# Batched generation: several snippets per completion, packed up to a prompt+output token budget
+FLASHCARD_BATCH_MODE = os.getenv("FLASHCARD_BATCH_MODE", "true").lower() == "true"
+FLASHCARD_BATCH_TOKEN_BUDGET = int(os.getenv("FLASHCARD_BATCH_TOKEN_BUDGET", 3000))
+FLASHCARD_BATCH_MAX_CARDS = int(os.getenv("FLASHCARD_BATCH_MAX_CARDS", 10))
+FLASHCARD_BATCH_RETRIES = int(os.getenv("FLASHCARD_BATCH_RETRIES", 1))
+
+# Content selection: round-robin across embedding clusters, or the best matches of the seed topics
+FLASHCARD_SAMPLING = os.getenv("FLASHCARD_SAMPLING", "clusters")
+FLASHCARD_SAMPLING_MODES = ("clusters", "topics")
+
+# Output tokens reserved per card in a batched completion
+FLASHCARD_CARD_TOKENS = 150
+
+FLASHCARD_SYSTEM_PROMPT = "You are a helpful assistant that creates simple educational flashcards. Always respond with valid JSON."
+
+FLASHCARD_BATCH_INSTRUCTIONS = """Create one clear question and answer for each numbered snippet below.
+
+Respond with only a JSON array containing one object per snippet, in snippet order:
+[
+    {"snippet": 1, "question": "Your question here?", "answer": "Your answer here."}
+]
+
+"""
+
+# Shared generation pool; calls abandoned at a deadline finish in the background
+_generation_executor = ThreadPoolExecutor(max_workers=FLASHCARD_GENERATION_WORKERS)
 
 @flashcards_bp.route("/generate-flashcards", methods=["POST"])
 def generate_flashcards():
     """Generate flashcards from knowledge base"""
     data = request.json
     count = data.get("count", 10)
+    compression = data.get("compression", False)
+    compression_ratio = data.get("compression_ratio", None)
+    deadline_seconds = data.get("deadline_seconds", FLASHCARD_DEADLINE_SECONDS)
+    batch = data.get("batch", FLASHCARD_BATCH_MODE)
+    sampling = data.get("sampling", FLASHCARD_SAMPLING)
+    use_pool = data.get("pool", True)
+
+    if sampling not in FLASHCARD_SAMPLING_MODES:
+        return jsonify({"error": f"Unknown sampling mode: {sampling}"}), 400
+
+    # compression is false, true (embedding scoring) or a method name
+    if compression is True:
+        compression = "embedding"
+    if compression and compression not in COMPRESSION_METHODS:
+        return jsonify({"error": f"Unknown compression method: {compression}"}), 400
 
     try:
         # Check if Pinecone index is healthy
@@ -28,134 +84,359 @@ def generate_flashcards():
                 "details": "The vector database is experiencing connectivity issues."
             }), 503
 
-        # Get content from Pinecone knowledge base
-        logger.info(f"Generating {count} flashcards from knowledge base")
-        
-        # Query Pinecone to get diverse content for flashcard generation
-        search_queries = [
-            "KTP platform features",
-            "vector database concepts", 
-            "semantic search technology",
-            "data integration process",
-            "knowledge management system",
-            "AI Q&A system",
-            "learning path features",
-            "flashcard generation",
-            "GitHub integration",
-            "Notion integration",
-            "Slack integration",
-            "deduplication system",
-            "embeddings technology",
-            "RAG system architecture",
-            "Pinecone database",
-            "OpenAI integration",
-            "Flask backend",
-            "Streamlit frontend"
-        ]
-        
-        # Collect content from Pinecone with proper embedding queries
-        knowledge_content = []
-        seen_content_hashes = set()
-        
-        for query in search_queries[:min(count * 2, len(search_queries))]:
-            try:
-                # Get embedding for the query
-                query_embedding = get_embedding(query)
-                
-                # Query Pinecone with the embedding
-                results = query_chunks(query_embedding, top_k=3)
-                
-                for result in results.matches:
-                    if result.metadata and result.metadata.get('text'):
-                        text = result.metadata['text']
-                        # Create a simple hash to avoid duplicate content
-                        content_hash = hash(text[:100])
-                        
-                        if content_hash not in seen_content_hashes:
-                            knowledge_content.append({
-                                'text': text,
-                                'source': result.metadata.get('source', 'Unknown'),
-                                'title': result.metadata.get('title', 'Unknown'),
-                                'score': result.score
-                            })
-                            seen_content_hashes.add(content_hash)
-            except Exception as e:
-                logger.warning(f"Failed to query for '{query}': {e}")
-                continue
-        
-        # Sort by relevance score and take the best content
-        knowledge_content.sort(key=lambda x: x.get('score', 0), reverse=True)
-        knowledge_content = knowledge_content[:count * 2]
-        
-        logger.info(f"Collected {len(knowledge_content)} unique content pieces from Pinecone")
+        started = time.perf_counter()
         
-        # Generate flashcards based on the collected content
-        flashcards = []
-        seen_questions = set()
+        # Ready-made cards (generated in the background with the default options) are served first
+        flashcards = flashcard_pool.take(count) if use_pool and not compression else []
+        pooled_count = len(flashcards)
         
-        for i in range(count):
-            if i < len(knowledge_content):
-                # Use actual knowledge base content
-                content = knowledge_content[i]
-                flashcard = generate_simple_flashcard_from_content(content)
-            else:
-                # Generate fallback flashcard
-                flashcard = generate_simple_fallback_flashcard()
-            
-            if flashcard:
-                # Check for duplicate questions
-                question = flashcard.get('question', '').strip()
-                if question and question not in seen_questions:
+        result = {"compression": None, "timings": {}, "deadline_exceeded": False, "completions": 0, "content_sources": 0}
+        if len(flashcards) < count:
+            result = generate_knowledge_base_flashcards(
+                count - len(flashcards), compression=compression, compression_ratio=compression_ratio,
+                deadline_seconds=deadline_seconds, batch=batch, sampling=sampling,
+                exclude_chunks={card['chunk_id'] for card in flashcards if card.get('chunk_id')}
+            )
+            seen_questions = {card['question'].strip() for card in flashcards}
+            for flashcard in result["flashcards"]:
+                if flashcard.get('question', '').strip() not in seen_questions:
                     flashcards.append(flashcard)
-                    seen_questions.add(question)
-                else:
-                    # Try to generate a different flashcard
-                    for attempt in range(3):
-                        if i < len(knowledge_content):
-                            content = knowledge_content[(i + attempt) % len(knowledge_content)]
-                            flashcard = generate_simple_flashcard_from_content(content)
-                        else:
-                            flashcard = generate_simple_fallback_flashcard()
-                        
-                        if flashcard:
-                            question = flashcard.get('question', '').strip()
-                            if question and question not in seen_questions:
-                                flashcards.append(flashcard)
-                                seen_questions.add(question)
-                                break
-
-        # Create flashcard set (in-memory only, no file persistence)
-        set_id = str(uuid.uuid4())
-        set_name = f"Flashcard Set {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        
-        flashcard_set = {
-            "id": set_id,
-            "name": set_name,
-            "card_count": len(flashcards),
-            "created_date": datetime.now().isoformat(),
-            "flashcards": flashcards
-        }
+                    seen_questions.add(flashcard['question'].strip())
+        timings = {**result["timings"], "total_ms": round((time.perf_counter() - started) * 1000, 1)}
 
-        # Store in memory only (no file persistence)
-        current_flashcard_sets.append(flashcard_set)
+        # Store the flashcard set (cards get IDs used by study sessions)
+        set_name = f"Flashcard Set {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        flashcard_set = flashcard_store.create_set(set_name, flashcards)
+        set_id = flashcard_set["id"]
+        flashcards = flashcard_set["flashcards"]
 
         # Log activity
         log_system_activity(f"Generated {len(flashcards)} flashcards from knowledge base", {
             "flashcard_count": len(flashcards),
-            "content_sources": len(knowledge_content)
+            "content_sources": result["content_sources"],
+            "pooled_cards": pooled_count
         })
 
         return jsonify({
             "status": "success",
             "flashcard_set": flashcard_set,
             "flashcards": flashcards,
-            "set_id": set_id
+            "set_id": set_id,
+            "compression": result["compression"],
+            "timings": timings,
+            "deadline_exceeded": result["deadline_exceeded"],
+            "completions": result["completions"],
+            "pooled_cards": pooled_count
         })
 
     except Exception as e:
         logger.error(f"Flashcard generation failed: {e}")
         return jsonify({"error": f"Flashcard generation failed: {str(e)}"}), 500
 
+def generate_knowledge_base_flashcards(count, compression=False, compression_ratio=None,
+                                       deadline_seconds=FLASHCARD_DEADLINE_SECONDS, batch=FLASHCARD_BATCH_MODE,
+                                       sampling=FLASHCARD_SAMPLING, fallback=True, exclude_chunks=None):
+    """Select knowledge-base content and generate up to count unique flashcards from it
+    
+    Content from chunks in exclude_chunks (chunk keys, e.g. of cards already pooled) is skipped.
+    Returns the cards (each with the chunk_id it was generated from, where known), compression
+    stats, per-stage timings, whether the deadline was hit, the number of completions and the
+    number of content pieces used.
+    """
+    exclude_chunks = exclude_chunks or set()
+    # Get content from Pinecone knowledge base
+    logger.info(f"Generating {count} flashcards from knowledge base")
+    
+    started = time.perf_counter()
+    timings = {}
+    # Every topic probes the index for clustering; topic retrieval uses the first count * 2
+    topics = flashcard_topics.get()
+    search_queries = topics if sampling == "clusters" else topics[:min(count * 2, len(topics))]
+    
+    # Seed query embeddings are computed once per model and then read from the store
+    search_embeddings = query_embeddings.get_many(search_queries)
+    timings["embedding_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    
+    stage_started = time.perf_counter()
+    knowledge_content = []
+    if sampling == "clusters":
+        # Draw content round-robin across clusters of the knowledge base (clustering cached per generation)
+        knowledge_content = content_sampler.sample(count * 2, search_embeddings, exclude=exclude_chunks)
+    if not knowledge_content:
+        # Query Pinecone for the seed queries concurrently
+        search_queries = search_queries[:min(count * 2, len(search_queries))]
+        knowledge_content = [
+            content for content in collect_knowledge_content(search_queries, search_embeddings[:len(search_queries)])
+            if content['chunk_id'] not in exclude_chunks
+        ]
+        
+        # Sort by relevance score and take the best content
+        knowledge_content.sort(key=lambda x: x.get('score', 0), reverse=True)
+        knowledge_content = knowledge_content[:count * 2]
+    timings["retrieval_ms"] = round((time.perf_counter() - stage_started) * 1000, 1)
+    
+    logger.info(f"Collected {len(knowledge_content)} unique content pieces from Pinecone")
+    
+    # Optionally shrink each piece to the sentences closest to the query that found it
+    compression_stats = None
+    stage_started = time.perf_counter()
+    if compression:
+        compression_stats = {"method": compression, "original_tokens": 0, "compressed_tokens": 0}
+        # Sentences of every piece are embedded in one request, then each piece is compressed against its own query
+        compressed_pieces = compress_batch(
+            [([content['text']], content['query'], content['query_embedding']) for content in knowledge_content],
+            ratio=compression_ratio, method=compression
+        )
+        for content, compressed in zip(knowledge_content, compressed_pieces):
+            content['text'] = compressed["texts"][0]
+            compression_stats["method"] = compressed["method"] or compression_stats["method"]
+            compression_stats["original_tokens"] += compressed["original_tokens"]
+            compression_stats["compressed_tokens"] += compressed["compressed_tokens"]
+    
+    timings["compression_ms"] = round((time.perf_counter() - stage_started) * 1000, 1)
+    
+    # Generate flashcards based on the collected content across the worker pool
+    stage_started = time.perf_counter()
+    flashcards, deadline_exceeded, completions = generate_unique_flashcards(
+        knowledge_content, count, time.monotonic() + deadline_seconds, batch=batch
+    )
+    if deadline_exceeded:
+        logger.warning(f"Flashcard generation hit the {deadline_seconds}s deadline with {len(flashcards)} cards")
+    
+    # Fall back to a generic card when the knowledge base has too little content
+    if fallback and len(flashcards) < count:
+        flashcard = generate_simple_fallback_flashcard()
+        if flashcard['question'] not in {card.get('question', '').strip() for card in flashcards}:
+            flashcards.append(flashcard)
+    timings["generation_ms"] = round((time.perf_counter() - stage_started) * 1000, 1)
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    
+    return {
+        "flashcards": flashcards,
+        "compression": compression_stats,
+        "timings": timings,
+        "deadline_exceeded": deadline_exceeded,
+        "completions": completions,
+        "content_sources": len(knowledge_content)
+    }
+
+def collect_knowledge_content(search_queries, search_embeddings):
+    """Query the knowledge base for every seed query concurrently, skipping duplicate content"""
+    def run_query(query, query_embedding):
+        try:
+            return query_chunks(query_embedding, top_k=3).matches
+        except Exception as e:
+            logger.warning(f"Failed to query for '{query}': {e}")
+            return []
+    
+    knowledge_content = []
+    seen_content_hashes = set()
+    workers = max(1, min(FLASHCARD_QUERY_CONCURRENCY, len(search_queries)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Results are consumed in seed-query order so the selection stays deterministic
+        all_matches = executor.map(run_query, search_queries, search_embeddings)
+        for query, query_embedding, matches in zip(search_queries, search_embeddings, all_matches):
+            for result in matches:
+                if result.metadata and result.metadata.get('text'):
+                    text = result.metadata['text']
+                    # Create a simple hash to avoid duplicate content
+                    content_hash = hash(text[:100])
+                    
+                    if content_hash not in seen_content_hashes:
+                        knowledge_content.append({
+                            'text': text,
+                            'source': result.metadata.get('source', 'Unknown'),
+                            'title': result.metadata.get('title', 'Unknown'),
+                            'score': result.score,
+                            'query': query,
+                            'query_embedding': query_embedding,
+                            'chunk_id': chunk_key(getattr(result, 'namespace', ''), result.id)
+                        })
+                        seen_content_hashes.add(content_hash)
+    return knowledge_content
+
+def generate_unique_flashcards(knowledge_content, count, deadline, batch=True):
+    """Generate up to count flashcards with unique questions in parallel, stopping at deadline (time.monotonic)
+    
+    In batch mode several snippets share one completion; snippets whose card comes back
+    invalid are retried (up to FLASHCARD_BATCH_RETRIES times) in a batch of their own.
+    A duplicate or failed card is replaced by generating from the next unused content.
+    Returns the cards in content order (tagged with the chunk_id of their content, where known),
+    whether the deadline was hit and the number of completions.
+    """
+    cards = {}
+    seen_questions = set()
+    pending = {}
+    attempts = {}
+    retry_positions = []
+    next_position = 0
+    completions = 0
+    max_attempts = 1 + FLASHCARD_BATCH_RETRIES if batch else 1
+    
+    def submit(positions):
+        nonlocal completions
+        contents = [knowledge_content[position] for position in positions]
+        if batch:
+            future = _generation_executor.submit(generate_flashcard_batch, contents)
+        else:
+            future = _generation_executor.submit(lambda content: [generate_simple_flashcard_from_content(content)], contents[0])
+        pending[future] = positions
+        completions += 1
+        for position in positions:
+            attempts[position] = attempts.get(position, 0) + 1
+    
+    def refill():
+        """Submit enough retried and unused content to reach count cards"""
+        nonlocal next_position
+        in_flight = sum(len(positions) for positions in pending.values())
+        positions = []
+        while len(cards) + in_flight + len(positions) < count:
+            if retry_positions:
+                positions.append(retry_positions.pop(0))
+            elif next_position < len(knowledge_content):
+                positions.append(next_position)
+                next_position += 1
+            else:
+                break
+        if batch:
+            groups = pack_flashcard_batches([knowledge_content[position] for position in positions])
+        else:
+            groups = [[i] for i in range(len(positions))]
+        for group in groups:
+            submit([positions[i] for i in group])
+    
+    refill()
+    
+    deadline_exceeded = False
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            deadline_exceeded = True
+            break
+        done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            positions = pending.pop(future)
+            for position, flashcard in zip(positions, future.result()):
+                # Single-card completions are not validated by the batch parser, so check every card here
+                question = answer = None
+                if isinstance(flashcard, dict):
+                    question, answer = flashcard.get('question'), flashcard.get('answer')
+                if not isinstance(question, str) or not isinstance(answer, str) or not question.strip() or not answer.strip():
+                    if attempts[position] < max_attempts:
+                        retry_positions.append(position)
+                elif question.strip() not in seen_questions and len(cards) < count:
+                    chunk_id = knowledge_content[position].get('chunk_id')
+                    cards[position] = {**flashcard, 'chunk_id': chunk_id} if chunk_id else flashcard
+                    seen_questions.add(question.strip())
+        refill()
+    
+    # Calls that have not started yet are dropped; running ones finish in the background
+    for future in pending:
+        future.cancel()
+    
+    return [cards[position] for position in sorted(cards)], deadline_exceeded, completions
+
+def pack_flashcard_batches(contents, token_budget=None, max_cards=None):
+    """Group contents into batches whose prompt and expected output fit the token budget
+    
+    Returns lists of indices into contents, in order; a snippet larger than the budget gets a batch of its own.
+    """
+    token_budget = token_budget or FLASHCARD_BATCH_TOKEN_BUDGET
+    max_cards = max_cards or FLASHCARD_BATCH_MAX_CARDS
+    overhead = estimate_tokens(FLASHCARD_SYSTEM_PROMPT + FLASHCARD_BATCH_INSTRUCTIONS)
+    
+    batches = []
+    current = []
+    current_tokens = overhead
+    for i, content in enumerate(contents):
+        tokens = estimate_tokens(format_flashcard_snippet(0, content)) + FLASHCARD_CARD_TOKENS
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_cards):
+            batches.append(current)
+            current = []
+            current_tokens = overhead
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def format_flashcard_snippet(number, content):
+    """Format one numbered snippet of a batched flashcard prompt"""
+    return f"Snippet {number} (Source: {content['source']}, Title: {content['title']}):\n{content['text']}\n\n"
+
+def generate_flashcard_batch(contents):
+    """Generate one flashcard per content in a single completion
+    
+    Returns a list aligned with contents holding each valid card, or None for snippets
+    whose entry was missing or invalid (or for all of them if the call failed).
+    """
+    try:
+        prompt = FLASHCARD_BATCH_INSTRUCTIONS + "".join(
+            format_flashcard_snippet(number, content) for number, content in enumerate(contents, 1)
+        )
+        
+        content_response = chat_completion(
+            [
+                {"role": "system", "content": FLASHCARD_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=FLASHCARD_CARD_TOKENS * len(contents) + 50,
+            temperature=0.7
+        )
+        
+        cards = parse_flashcard_batch(content_response, len(contents))
+        invalid = sum(card is None for card in cards)
+        if invalid:
+            logger.warning(f"Flashcard batch returned {invalid}/{len(contents)} invalid entries")
+        return cards
+    
+    except Exception as e:
+        logger.error(f"Error generating flashcard batch of {len(contents)}: {e}")
+        return [None] * len(contents)
+
+def parse_flashcard_batch(response, size):
+    """Parse and repair a JSON array of flashcards, returning a list of size cards (None where invalid)
+    
+    Tolerates code fences, surrounding prose, trailing commas and truncated output: when the
+    array cannot be parsed as a whole, every complete object in it is parsed on its own.
+    Entries are matched to snippets by their "snippet" number, falling back to their position.
+    """
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', (response or "").strip())
+    start = text.find('[')
+    if start == -1:
+        start = text.find('{')
+    text = re.sub(r',\s*([\]}])', r'\1', text[max(start, 0):])
+    
+    try:
+        entries = json.loads(text)
+        if isinstance(entries, dict):
+            entries = [entries]
+    except json.JSONDecodeError:
+        entries = []
+        decoder = json.JSONDecoder()
+        position = text.find('{')
+        while position != -1:
+            try:
+                entry, end = decoder.raw_decode(text, position)
+                entries.append(entry)
+                position = text.find('{', end)
+            except json.JSONDecodeError:
+                position = text.find('{', position + 1)
+    
+    cards = [None] * size
+    for i, entry in enumerate(entries if isinstance(entries, list) else []):
+        if not isinstance(entry, dict):
+            continue
+        question = entry.get('question')
+        answer = entry.get('answer')
+        if not isinstance(question, str) or not isinstance(answer, str) or not question.strip() or not answer.strip():
+            continue
+        number = entry.get('snippet')
+        index = number - 1 if isinstance(number, int) and not isinstance(number, bool) else i
+        if 0 <= index < size and cards[index] is None:
+            cards[index] = {"question": question.strip(), "answer": answer.strip()}
+    return cards
+
 def generate_simple_flashcard_from_content(content):
     """Generate a simple Q&A flashcard from content"""
     try:
@@ -178,11 +459,10 @@ Format as JSON:
     "answer": "Your answer here."
 }}"""
 
-        # Generate flashcard using OpenAI
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that creates simple educational flashcards. Always respond with valid JSON."},
+        # Generate flashcard using the configured LLM provider
+        content_response = chat_completion(
+            [
+                {"role": "system", "content": FLASHCARD_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=300,
@@ -190,7 +470,6 @@ Format as JSON:
         )
 
         # Parse the response
-        content_response = response.choices[0].message.content
         try:
             import json
             flashcard = json.loads(content_response)
@@ -213,13 +492,76 @@ def generate_simple_fallback_flashcard():
         "answer": "Knowledge management is the process of capturing, organizing, storing, and sharing knowledge within an organization."
     }
 
+@flashcards_bp.route("/flashcard-topics", methods=["GET"])
+def get_flashcard_topics():
+    """Get the seed topics used to retrieve content for flashcards"""
+    try:
+        return jsonify({
+            "status": "success",
+            "topics": flashcard_topics.get(),
+            "embeddings": query_embeddings.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Failed to get flashcard topics: {e}")
+        return jsonify({"error": f"Failed to get flashcard topics: {str(e)}"}), 500
+
+@flashcards_bp.route("/flashcard-topics", methods=["PUT"])
+def update_flashcard_topics():
+    """Replace the seed topics (an empty list restores the defaults) and embed any new ones"""
+    data = request.json
+    topics = data.get("topics")
+    
+    if not isinstance(topics, list) or not all(isinstance(topic, str) and topic.strip() for topic in topics):
+        return jsonify({"error": "topics must be a list of non-empty strings"}), 400
+    
+    try:
+        topics = list(dict.fromkeys(topic.strip() for topic in topics))
+        flashcard_topics.set(topics)
+        topics = flashcard_topics.get()
+        
+        # Embed new topics now so flashcard generation never waits on them
+        query_embeddings.get_many(topics)
+        
+        log_system_activity(f"Updated flashcard topics ({len(topics)} topics)", {"topic_count": len(topics)})
+        
+        return jsonify({
+            "status": "success",
+            "topics": topics
+        })
+    except Exception as e:
+        logger.error(f"Failed to update flashcard topics: {e}")
+        return jsonify({"error": f"Failed to update flashcard topics: {str(e)}"}), 500
+
+@flashcards_bp.route("/flashcard-pool", methods=["GET"])
+def get_flashcard_pool():
+    """Get the fill level of the background flashcard pool"""
+    try:
+        return jsonify({
+            "status": "success",
+            "pool": flashcard_pool.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Failed to get flashcard pool stats: {e}")
+        return jsonify({"error": f"Failed to get flashcard pool stats: {str(e)}"}), 500
+
 @flashcards_bp.route("/flashcard-sets", methods=["GET"])
 def get_flashcard_sets():
-    """Get all flashcard sets (in-memory only)"""
+    """List flashcard set summaries, newest first (paginated with limit and cursor)"""
     try:
+        limit = request.args.get("limit", FLASHCARD_SETS_PAGE_SIZE, type=int)
+        cursor = request.args.get("cursor")
+        
+        after = None
+        if cursor:
+            after = flashcard_store.decode_cursor(cursor)
+            if after is None:
+                return jsonify({"error": "Invalid cursor"}), 400
+        
+        sets, next_cursor = flashcard_store.list_sets(limit=limit, cursor=after)
         return jsonify({
             "status": "success",
-            "sets": current_flashcard_sets
+            "sets": sets,
+            "next_cursor": next_cursor
         })
     except Exception as e:
         logger.error(f"Failed to get flashcard sets: {e}")
@@ -229,39 +571,36 @@ def get_flashcard_sets():
 def get_flashcard_set(set_id):
     """Get a specific flashcard set"""
     try:
-        for flashcard_set in current_flashcard_sets:
-            if flashcard_set["id"] == set_id:
-                return jsonify({
-                    "status": "success",
-                    "flashcard_set": flashcard_set
-                })
+        flashcard_set = flashcard_store.get_set(set_id)
+        if flashcard_set is None:
+            return jsonify({"error": "Flashcard set not found"}), 404
         
-        return jsonify({"error": "Flashcard set not found"}), 404
+        return jsonify({
+            "status": "success",
+            "flashcard_set": flashcard_set
+        })
     except Exception as e:
         logger.error(f"Failed to get flashcard set: {e}")
         return jsonify({"error": f"Failed to get flashcard set: {str(e)}"}), 500
 
 @flashcards_bp.route("/flashcard-sets/<set_id>", methods=["DELETE"])
 def delete_flashcard_set(set_id):
-    """Delete a flashcard set"""
+    """Delete a flashcard set with its study sessions"""
     try:
-        # Find and remove the set from memory
-        for i, flashcard_set in enumerate(current_flashcard_sets):
-            if flashcard_set["id"] == set_id:
-                deleted_set = current_flashcard_sets.pop(i)
-                
-                # Log activity
-                log_system_activity(f"Deleted flashcard set: {deleted_set['name']}", {
-                    "set_id": set_id,
-                    "card_count": deleted_set.get("card_count", 0)
-                })
-                
-                return jsonify({
-                    "status": "success",
-                    "message": "Flashcard set deleted successfully"
-                })
+        deleted_set = flashcard_store.delete_set(set_id)
+        if deleted_set is None:
+            return jsonify({"error": "Flashcard set not found"}), 404
+        
+        # Log activity
+        log_system_activity(f"Deleted flashcard set: {deleted_set['name']}", {
+            "set_id": set_id,
+            "card_count": deleted_set.get("card_count", 0)
+        })
         
-        return jsonify({"error": "Flashcard set not found"}), 404
+        return jsonify({
+            "status": "success",
+            "message": "Flashcard set deleted successfully"
+        })
     except Exception as e:
         logger.error(f"Failed to delete flashcard set: {e}")
         return jsonify({"error": f"Failed to delete flashcard set: {str(e)}"}), 500
@@ -273,50 +612,89 @@ def start_study_session():
     set_id = data.get("set_id")
     study_mode = data.get("study_mode", "Review All")
     
+    if study_mode not in STUDY_MODES:
+        return jsonify({"error": f"Unknown study mode: {study_mode} (expected one of {', '.join(STUDY_MODES)})"}), 400
+    
     try:
-        for flashcard_set in current_flashcard_sets:
-            if flashcard_set["id"] == set_id:
-                # Create study session
-                session_id = str(uuid.uuid4())
-                session = {
-                    "id": session_id,
-                    "set_id": set_id,
-                    "study_mode": study_mode,
-                    "started_at": datetime.now().isoformat(),
-                    "cards": flashcard_set["flashcards"],
-                    "current_card": 0,
-                    "correct_answers": 0,
-                    "total_answered": 0
-                }
-                
-                # In a full implementation, you'd store this in a database
-                # For now, we'll return the session data
-                return jsonify({
-                    "status": "success",
-                    "session": session
-                })
+        session = flashcard_store.create_session(set_id, study_mode)
+        if session is None:
+            return jsonify({"error": "Flashcard set not found"}), 404
         
-        return jsonify({"error": "Flashcard set not found"}), 404
+        return jsonify({
+            "status": "success",
+            "session": session
+        })
     except Exception as e:
         logger.error(f"Failed to start study session: {e}")
         return jsonify({"error": f"Failed to start study session: {str(e)}"}), 500
 
+@flashcards_bp.route("/study-session/<session_id>", methods=["GET"])
+def get_study_session(session_id):
+    """Get the progress of a study session"""
+    try:
+        session = flashcard_store.get_session(session_id)
+        if session is None:
+            return jsonify({"error": "Study session not found"}), 404
+        
+        return jsonify({
+            "status": "success",
+            "session": session
+        })
+    except Exception as e:
+        logger.error(f"Failed to get study session: {e}")
+        return jsonify({"error": f"Failed to get study session: {str(e)}"}), 500
+
 @flashcards_bp.route("/study-session/<session_id>/answer", methods=["POST"])
-def submit_answer():
+def submit_answer(session_id):
     """Submit an answer for a study session"""
     data = request.json
-    session_id = data.get("session_id")
     answer = data.get("answer")
-    is_correct = data.get("is_correct", False)
+    quality = data.get("quality")
+    card_id = data.get("card_id")
+    
+    # quality grades recall from 0 (blackout) to 5 (perfect); without it is_correct is graded
+    if quality is not None and (not isinstance(quality, int) or isinstance(quality, bool) or not 0 <= quality <= 5):
+        return jsonify({"error": "quality must be an integer from 0 to 5"}), 400
+    is_correct = data.get("is_correct", quality is not None and quality >= PASSING_QUALITY)
     
     try:
-        # In a full implementation, you'd update the session in a database
-        # For now, we'll return a success response
+        # The answer, the session counters and the card's schedule are recorded in one transaction
+        session = flashcard_store.record_answer(session_id, answer, is_correct, card_id=card_id, quality=quality)
+        if session is None:
+            return jsonify({"error": "Study session not found"}), 404
+        
         return jsonify({
             "status": "success",
             "message": "Answer recorded successfully",
-            "is_correct": is_correct
+            "is_correct": is_correct,
+            "session": session
         })
+    except CardNotFoundError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Failed to submit answer: {e}")
         return jsonify({"error": f"Failed to submit answer: {str(e)}"}), 500
+
+@flashcards_bp.route("/flashcards/due", methods=["GET"])
+def get_due_flashcards():
+    """Get the next batch of cards due for review (optionally of one set), most overdue first"""
+    try:
+        due = flashcard_store.get_due_cards(
+            set_id=request.args.get("set_id"),
+            limit=request.args.get("limit", DUE_CARDS_BATCH_SIZE, type=int),
+            within_hours=request.args.get("within_hours", 0, type=float)
+        )
+        return jsonify({
+            "status": "success",
+            **due
+        })
+    except Exception as e:
+        logger.error(f"Failed to get due flashcards: {e}")
+        return jsonify({"error": f"Failed to get due flashcards: {str(e)}"}), 500
+
+# Background pool refills use the default options and no generic fallback card
+flashcard_pool.set_generator(
+    lambda count, exclude_chunks: generate_knowledge_base_flashcards(
+        count, fallback=False, exclude_chunks=exclude_chunks
+    )["flashcards"]
+)
@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify
 from utils.pinecone_utils import index
-from utils.openai_utils import client
+from utils.llm_provider import llm_provider
 
 health_bp = Blueprint('health', __name__)
 
@@ -11,14 +11,14 @@ def health_check():
         # Check Pinecone connection
         index_stats = index.describe_index_stats()
         
-        # Check OpenAI connection (simple test)
-        test_response = client.models.list()
+        # Check the LLM provider connection (simple test)
+        llm_provider.health_check()
         
         return jsonify({
             "status": "healthy",
             "services": {
                 "pinecone": "connected",
-                "openai": "connected"
+                llm_provider.name: "connected"
             },
             "index_stats": {
                 "total_vector_count": index_stats.total_vector_count,
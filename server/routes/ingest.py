@@ -1,35 +1,101 @@
-from flask import Blueprint, request, jsonify
-from utils.chunker import chunk_text
-from utils.openai_utils import get_embedding
-from utils.pinecone_utils import upsert_chunks
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from utils.chunker import chunk_text_stream
+from utils.enhanced_chunker import generate_chunk_id
+from utils.llm_provider import get_embeddings
+from utils.pinecone_utils import upsert_chunks, prune_source, namespace_for
+from utils.pdf_utils import iter_pdf_pages, PDF_SUPPORT
 from utils.activity_tracker import log_upload_activity
-import uuid
+from utils.flashcard_pool import flashcard_pool
+import codecs
 import datetime
+import json
 import os
-import io
-
-# Optional PDF support
-try:
-    import PyPDF2
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
+import tempfile
 
 ingest_bp = Blueprint('ingest', __name__)
 
-def extract_text_from_pdf(file_content):
-    """Extract text from PDF file content"""
-    if not PDF_SUPPORT:
-        raise Exception("PDF support not available. Install PyPDF2: pip install PyPDF2")
-    
-    try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
-    except Exception as e:
-        raise Exception(f"Failed to extract text from PDF: {str(e)}")
+# Chunks embedded and upserted per batch
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 100))
+
+# Upload size cap, in-memory spool size and copy block size (bytes)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", 1024 * 1024))
+UPLOAD_BLOCK_SIZE = 64 * 1024
+
+def store_text_batches(pieces, source, metadata):
+    """Chunk a stream of text pieces and embed/upsert them in batches, yielding the running chunk count after each batch"""
+    vector_ids = []
+    batch = []
+
+    def flush():
+        embeddings = get_embeddings(batch)
+        vectors = []
+        for chunk, embedding in zip(batch, embeddings):
+            chunk_index = len(vector_ids)
+            vector_ids.append(generate_chunk_id(source, chunk_index))
+            vectors.append({
+                "id": vector_ids[-1],
+                "values": embedding,
+                "metadata": {
+                    **metadata,
+                    "source": source,
+                    "text": chunk,
+                    "chunk_index": chunk_index,
+                    "timestamp": datetime.datetime.now().isoformat()
+                }
+            })
+        upsert_chunks(vectors)
+        batch.clear()
+
+    for chunk in chunk_text_stream(pieces):
+        if not chunk:
+            continue
+        batch.append(chunk)
+        if len(batch) >= EMBED_BATCH_SIZE:
+            flush()
+            yield len(vector_ids)
+    if batch:
+        flush()
+        yield len(vector_ids)
+
+    # An empty document leaves the previously stored version untouched
+    if vector_ids:
+        prune_source(source, vector_ids, namespace_for(metadata))
+
+def store_text_stream(pieces, source, metadata):
+    """Chunk, embed and upsert a stream of text pieces, returning the number of chunks stored"""
+    chunks_stored = 0
+    for chunks_stored in store_text_batches(pieces, source, metadata):
+        pass
+    return chunks_stored
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds UPLOAD_MAX_BYTES"""
+
+def spool_upload(file, spool):
+    """Copy an upload into a temporary file block by block, enforcing UPLOAD_MAX_BYTES"""
+    size = 0
+    while True:
+        block = file.stream.read(UPLOAD_BLOCK_SIZE)
+        if not block:
+            break
+        size += len(block)
+        if size > UPLOAD_MAX_BYTES:
+            raise UploadTooLarge(f"File exceeds the {UPLOAD_MAX_BYTES} byte upload limit")
+        spool.write(block)
+    spool.flush()
+    spool.seek(0)
+    return size
+
+def iter_text_file(spool):
+    """Decode a UTF-8 file incrementally, block by block"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        block = spool.read(UPLOAD_BLOCK_SIZE)
+        if not block:
+            break
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
 
 @ingest_bp.route("/ingest", methods=["POST"])
 def ingest():
@@ -40,31 +106,16 @@ def ingest():
     if not full_text or not metadata.get("source"):
         return jsonify({"error": "Missing text or metadata.source"}), 400
 
-    chunks = chunk_text(full_text)
-
-    vectors = []
-    for i, chunk in enumerate(chunks):
-        embedding = get_embedding(chunk)
-        vectors.append({
-            "id": str(uuid.uuid4()),
-            "values": embedding,
-            "metadata": {
-                **metadata,
-                "text": chunk,
-                "chunk_index": i,
-                "timestamp": datetime.datetime.now().isoformat()
-            }
-        })
-
-    upsert_chunks(vectors)
-    
+    chunks_stored = store_text_stream([full_text], metadata["source"], metadata)
+
     # Log activity
     title = metadata.get("title", metadata.get("source", "Unknown"))
-    log_upload_activity("text", title, len(vectors))
-    
+    log_upload_activity("text", title, chunks_stored)
+    flashcard_pool.refresh()
+
     return jsonify({
         "status": "success",
-        "chunks_stored": len(vectors),
+        "chunks_stored": chunks_stored,
         "source": metadata.get("source"),
         "type": metadata.get("type")
     })
@@ -74,62 +125,72 @@ def ingest_file():
     """Handle file uploads (PDF, TXT)"""
     if 'file' not in request.files:
         return jsonify({"error": "No file provided"}), 400
-    
+
     file = request.files['file']
     if file.filename == '':
         return jsonify({"error": "No file selected"}), 400
-    
+
     # Get metadata from form data
     source = request.form.get('source', file.filename)
     doc_type = request.form.get('type', 'document')
-    
+
+    filename = file.filename.lower()
+    if filename.endswith('.pdf'):
+        if not PDF_SUPPORT:
+            return jsonify({"error": "PDF support not available. Install PyPDF2: pip install PyPDF2"}), 400
+        # PDF pages are extracted by worker processes, which need a path on disk
+        spool = tempfile.NamedTemporaryFile(suffix=".pdf")
+    elif filename.endswith('.txt'):
+        spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    else:
+        return jsonify({"error": "Unsupported file type. Use PDF or TXT"}), 400
+
     try:
-        # Read file content
-        file_content = file.read()
-        
-        # Extract text based on file type
-        if file.filename.lower().endswith('.pdf'):
-            if not PDF_SUPPORT:
-                return jsonify({"error": "PDF support not available. Install PyPDF2: pip install PyPDF2"}), 400
-            full_text = extract_text_from_pdf(file_content)
-        elif file.filename.lower().endswith('.txt'):
-            full_text = file_content.decode('utf-8')
-        else:
-            return jsonify({"error": "Unsupported file type. Use PDF or TXT"}), 400
-        
-        if not full_text.strip():
-            return jsonify({"error": "No text content found in file"}), 400
-        
-        # Process the text
-        chunks = chunk_text(full_text)
-        
-        vectors = []
-        for i, chunk in enumerate(chunks):
-            embedding = get_embedding(chunk)
-            vectors.append({
-                "id": str(uuid.uuid4()),
-                "values": embedding,
-                "metadata": {
-                    "source": source,
-                    "type": doc_type,
-                    "text": chunk,
-                    "chunk_index": i,
-                    "timestamp": datetime.datetime.now().isoformat()
-                }
-            })
-        
-        upsert_chunks(vectors)
-        
-        # Log activity
-        log_upload_activity("file", file.filename, len(vectors))
-        
-        return jsonify({
+        spool_upload(file, spool)
+    except UploadTooLarge as e:
+        spool.close()
+        return jsonify({"error": str(e)}), 413
+    except Exception as e:
+        spool.close()
+        return jsonify({"error": f"File processing failed: {str(e)}"}), 500
+
+    # Extracted text is streamed into the chunker, never held in full
+    pieces = iter_pdf_pages(spool.name) if filename.endswith('.pdf') else iter_text_file(spool)
+
+    def finish(chunks_stored):
+        """Build the final response body for the upload"""
+        if not chunks_stored:
+            return {"error": "No text content found in file"}
+        log_upload_activity("file", file.filename, chunks_stored)
+        flashcard_pool.refresh()
+        return {
             "status": "success",
-            "chunks_stored": len(vectors),
+            "chunks_stored": chunks_stored,
             "source": source,
             "type": doc_type,
             "filename": file.filename
-        })
-        
+        }
+
+    if request.form.get('stream', 'false').lower() == 'true':
+        # Chunked NDJSON response with one progress line per stored batch
+        def generate():
+            chunks_stored = 0
+            try:
+                with spool:
+                    for chunks_stored in store_text_batches(pieces, source, {"type": doc_type}):
+                        yield json.dumps({"status": "processing", "chunks_stored": chunks_stored}) + "\n"
+                yield json.dumps(finish(chunks_stored)) + "\n"
+            except Exception as e:
+                yield json.dumps({"error": f"File processing failed: {str(e)}"}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    try:
+        with spool:
+            result = finish(store_text_stream(pieces, source, {"type": doc_type}))
+        if "error" in result:
+            return jsonify(result), 400
+        return jsonify(result)
+
     except Exception as e:
         return jsonify({"error": f"File processing failed: {str(e)}"}), 500
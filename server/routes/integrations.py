@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from utils.integration_manager import integration_manager
-from utils.activity_tracker import log_integration_activity
+from utils.activity_tracker import log_integration_activity, log_system_activity
+from utils.flashcard_pool import flashcard_pool
 import os
 import datetime
 
@@ -23,6 +24,7 @@ def integrate_github():
         if result["success"]:
             # Log integration activity
             log_integration_activity("GitHub", result["chunks_stored"], result["duplicates_removed"])
+            flashcard_pool.refresh()
             
             return jsonify({
                 "status": "success",
@@ -63,6 +65,7 @@ def integrate_notion():
         if result["success"]:
             # Log integration activity
             log_integration_activity("Notion", result["chunks_stored"], result["duplicates_removed"])
+            flashcard_pool.refresh()
             
             return jsonify({
                 "status": "success",
@@ -98,11 +101,13 @@ def integrate_slack():
         if result["success"]:
             # Log integration activity
             log_integration_activity("Slack", result["chunks_stored"], result["duplicates_removed"])
+            flashcard_pool.refresh()
             
             return jsonify({
                 "status": "success",
                 "source": result["source"],
                 "messages_processed": result["messages_processed"],
+                "windows_processed": result["windows_processed"],
                 "chunks_processed": result["chunks_processed"],
                 "chunks_stored": result["chunks_stored"],
                 "duplicates_removed": result["duplicates_removed"],
@@ -161,6 +166,7 @@ def integrate_bulk():
         )
         
         if result["success"]:
+            flashcard_pool.refresh()
             return jsonify({
                 "status": "success",
                 "integrations_processed": len(result["integrations"]),
@@ -204,6 +210,7 @@ def integrate_all():
         )
         
         if result["success"]:
+            flashcard_pool.refresh()
             return jsonify({
                 "status": "success",
                 "integrations_processed": len(result["integrations"]),
@@ -219,6 +226,31 @@ def integrate_all():
     except Exception as e:
         return jsonify({"error": f"All sources integration failed: {str(e)}"}), 500
 
+@integrations_bp.route("/integrate/<integration>", methods=["DELETE"])
+def purge_integration(integration):
+    """Delete all vectors of an integration by dropping its namespace"""
+    try:
+        from utils.pinecone_utils import namespace_for_integration, purge_namespace
+        
+        namespace = namespace_for_integration(integration)
+        removed = purge_namespace(namespace)
+        flashcard_pool.refresh()
+        
+        log_system_activity(f"Purged {integration} data", {
+            "integration": integration,
+            "namespace": namespace,
+            "registered_vectors_removed": removed
+        })
+        
+        return jsonify({
+            "status": "success",
+            "integration": integration,
+            "namespace": namespace,
+            "registered_vectors_removed": removed
+        })
+    except Exception as e:
+        return jsonify({"error": f"Failed to purge {integration} data: {str(e)}"}), 500
+
 @integrations_bp.route("/stats", methods=["GET"])
 def get_integration_stats():
     """Get statistics about integrated data"""
@@ -1,22 +1,148 @@
 from flask import Blueprint, request, jsonify
 import logging
-from utils.openai_utils import get_embedding
-from utils.pinecone_utils import query_chunks, check_index_health
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from utils.llm_provider import get_embedding, get_embeddings
+from utils.pinecone_utils import (
+    query_chunks, query_chunk_ids, fetch_chunks, check_index_health,
+    namespaces_for_integrations, get_kb_generation
+)
+from utils.search_cache import search_cache, search_cursors
 from utils.activity_tracker import log_search_activity
 
 search_bp = Blueprint('search', __name__)
 logger = logging.getLogger(__name__)
 
+# Vector queries run in parallel by /search/batch, and the most queries it accepts
+SEARCH_BATCH_CONCURRENCY = int(os.getenv("SEARCH_BATCH_CONCURRENCY", 4))
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", 50))
+
+# Candidates over-fetched (IDs only) when a paginated search starts
+SEARCH_PAGINATION_MAX_RESULTS = int(os.getenv("SEARCH_PAGINATION_MAX_RESULTS", 200))
+
+def format_matches(matches):
+    """Format query matches for search responses"""
+    formatted_results = []
+    for match in matches:
+        formatted_results.append({
+            "id": match.id,
+            "score": match.score,
+            "text": match.metadata.get("text", ""),
+            "source": match.metadata.get("source", ""),
+            "type": match.metadata.get("type", ""),
+            "chunk_index": match.metadata.get("chunk_index", 0),
+            "timestamp": match.metadata.get("timestamp", "")
+        })
+    return formatted_results
+
+def search_error_response(error_msg):
+    """Map a search failure to an error response"""
+    # Provide specific error messages for common issues
+    if "too many" in error_msg.lower() or "rate limit" in error_msg.lower():
+        return jsonify({
+            "error": "Search rate limit exceeded. Please wait a moment and try again.",
+            "details": "Too many requests to the vector database. Please slow down your search requests."
+        }), 429
+    elif "500" in error_msg or "internal server error" in error_msg.lower():
+        return jsonify({
+            "error": "Vector database service temporarily unavailable.",
+            "details": "The search service is experiencing issues. Please try again in a few minutes."
+        }), 503
+    elif "connection" in error_msg.lower() or "timeout" in error_msg.lower():
+        return jsonify({
+            "error": "Unable to connect to search service.",
+            "details": "Network connectivity issues with the vector database."
+        }), 503
+    else:
+        return jsonify({
+            "error": f"Search failed: {error_msg}",
+            "details": "An unexpected error occurred during the search operation."
+        }), 500
+
+def hydrate_candidates(candidates):
+    """Fetch the metadata of (namespace, id, score) candidates and format them in rank order"""
+    ids_by_namespace = {}
+    for namespace, vector_id, _ in candidates:
+        ids_by_namespace.setdefault(namespace, []).append(vector_id)
+    metadata_by_key = {}
+    for namespace, ids in ids_by_namespace.items():
+        for vector_id, metadata in fetch_chunks(ids, namespace).items():
+            metadata_by_key[(namespace, vector_id)] = metadata
+    # Candidates deleted since the search started are skipped
+    return format_matches([
+        SimpleNamespace(id=vector_id, score=score, metadata=metadata_by_key[(namespace, vector_id)])
+        for namespace, vector_id, score in candidates
+        if (namespace, vector_id) in metadata_by_key
+    ])
+
+def search_page(token, search, candidates, offset, page_size):
+    """Hydrate one page of a paginated search"""
+    offset = max(0, offset)
+    page = candidates[offset:offset + page_size]
+    formatted_results = hydrate_candidates(page)
+    next_offset = offset + len(page)
+    return jsonify({
+        "status": "success",
+        "query": search["query"],
+        "results": formatted_results,
+        "total_results": len(formatted_results),
+        "total_candidates": len(candidates),
+        "offset": offset,
+        "next_cursor": search_cursors.encode(token, next_offset) if next_offset < len(candidates) else None
+    })
+
 @search_bp.route("/search", methods=["POST"])
 def search():
     data = request.json
     query = data.get("query", "")
     top_k = data.get("top_k", 5)
     metadata_filter = data.get("filter", None)
+    mmr = data.get("mmr", False)
+    mmr_lambda = data.get("mmr_lambda", 0.5)
+    namespaces = namespaces_for_integrations(data.get("integrations"))
+    page_size = data.get("page_size", None)
+    cursor = data.get("cursor", None)
+
+    # Later pages are served from the candidate list stored with the cursor
+    if cursor:
+        token, offset = search_cursors.decode(cursor)
+        entry = search_cursors.get(token) if token else None
+        if entry is None:
+            return jsonify({"error": "Cursor is invalid or has expired. Please run the search again."}), 410
+        search, candidates = entry
+        try:
+            return search_page(token, search, candidates, offset, page_size or search["page_size"])
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Search page failed: {error_msg}")
+            return search_error_response(error_msg)
 
     if not query:
         return jsonify({"error": "Missing query parameter"}), 400
 
+    if page_size:
+        if mmr:
+            return jsonify({"error": "mmr cannot be combined with page_size"}), 400
+        return start_paginated_search(query, page_size, metadata_filter, namespaces)
+
+    # Repeated searches between ingests are served without touching Pinecone
+    cache_key = search_cache.make_key(query, metadata_filter, top_k, {
+        "mmr": mmr, "mmr_lambda": mmr_lambda, "namespaces": namespaces
+    })
+    generation = get_kb_generation()
+    cached_results = search_cache.get(cache_key, generation)
+    if cached_results is not None:
+        log_search_activity(query, len(cached_results))
+        return jsonify({
+            "status": "success",
+            "query": query,
+            "results": cached_results,
+            "total_results": len(cached_results),
+            "cached": True
+        })
+
     try:
         # First check if Pinecone index is healthy
         if not check_index_health():
@@ -31,20 +157,12 @@ def search():
         
         # Search for similar chunks with retry logic
         logger.info(f"Searching for {top_k} results...")
-        results = query_chunks(query_embedding, top_k=top_k, metadata_filter=metadata_filter)
+        results = query_chunks(query_embedding, top_k=top_k, metadata_filter=metadata_filter,
+                               mmr=mmr, mmr_lambda=mmr_lambda, namespaces=namespaces)
         
         # Format results
-        formatted_results = []
-        for match in results.matches:
-            formatted_results.append({
-                "id": match.id,
-                "score": match.score,
-                "text": match.metadata.get("text", ""),
-                "source": match.metadata.get("source", ""),
-                "type": match.metadata.get("type", ""),
-                "chunk_index": match.metadata.get("chunk_index", 0),
-                "timestamp": match.metadata.get("timestamp", "")
-            })
+        formatted_results = format_matches(results.matches)
+        search_cache.put(cache_key, generation, formatted_results)
         
         logger.info(f"Search completed successfully with {len(formatted_results)} results")
         
@@ -55,31 +173,163 @@ def search():
             "status": "success",
             "query": query,
             "results": formatted_results,
-            "total_results": len(formatted_results)
+            "total_results": len(formatted_results),
+            "cached": False
         })
         
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Search failed: {error_msg}")
-        
-        # Provide specific error messages for common issues
-        if "too many" in error_msg.lower() or "rate limit" in error_msg.lower():
-            return jsonify({
-                "error": "Search rate limit exceeded. Please wait a moment and try again.",
-                "details": "Too many requests to the vector database. Please slow down your search requests."
-            }), 429
-        elif "500" in error_msg or "internal server error" in error_msg.lower():
-            return jsonify({
-                "error": "Vector database service temporarily unavailable.",
-                "details": "The search service is experiencing issues. Please try again in a few minutes."
-            }), 503
-        elif "connection" in error_msg.lower() or "timeout" in error_msg.lower():
+        return search_error_response(error_msg)
+
+def start_paginated_search(query, page_size, metadata_filter, namespaces):
+    """Over-fetch candidate IDs for a query, store them behind a cursor and return the first page"""
+    try:
+        if not check_index_health():
             return jsonify({
-                "error": "Unable to connect to search service.",
-                "details": "Network connectivity issues with the vector database."
+                "error": "Pinecone index is currently unavailable. Please try again later.",
+                "details": "The vector database is experiencing connectivity issues."
             }), 503
-        else:
-            return jsonify({
-                "error": f"Search failed: {error_msg}",
-                "details": "An unexpected error occurred during the search operation."
-            }), 500
+
+        query_embedding = get_embedding(query)
+        candidates = query_chunk_ids(query_embedding, top_k=SEARCH_PAGINATION_MAX_RESULTS,
+                                     metadata_filter=metadata_filter, namespaces=namespaces)
+        search = {"query": query, "page_size": page_size}
+        token = search_cursors.create(search, candidates)
+        logger.info(f"Paginated search stored {len(candidates)} candidates")
+
+        log_search_activity(query, len(candidates))
+
+        return search_page(token, search, candidates, 0, page_size)
+
+    except Exception as e:
+        error_msg = str(e)
+        logger.error(f"Search failed: {error_msg}")
+        return search_error_response(error_msg)
+
+@search_bp.route("/search/batch", methods=["POST"])
+def search_batch():
+    """Run many searches with one batched embedding call and concurrent vector queries
+
+    Each entry of "queries" is either a query string or an object with "query"
+    and optional per-query "top_k", "filter", "mmr", "mmr_lambda" and "integrations" overrides
+    of the request-level defaults.
+    """
+    data = request.json
+    queries = data.get("queries", [])
+    defaults = {
+        "top_k": data.get("top_k", 5),
+        "filter": data.get("filter", None),
+        "mmr": data.get("mmr", False),
+        "mmr_lambda": data.get("mmr_lambda", 0.5),
+        "integrations": data.get("integrations")
+    }
+
+    if not queries:
+        return jsonify({"error": "Missing queries parameter"}), 400
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        return jsonify({"error": f"Too many queries (max {SEARCH_BATCH_MAX_QUERIES})"}), 400
+
+    searches = [{**defaults, **(q if isinstance(q, dict) else {"query": q})} for q in queries]
+    if any(not search.get("query") for search in searches):
+        return jsonify({"error": "Every batch entry needs a non-empty query"}), 400
+
+    try:
+        started = time.perf_counter()
+
+        # Serve repeated searches from the result cache
+        generation = get_kb_generation()
+        cache_keys = []
+        batch_results = []
+        for search in searches:
+            cache_key = search_cache.make_key(search["query"], search["filter"], search["top_k"], {
+                "mmr": search["mmr"], "mmr_lambda": search["mmr_lambda"],
+                "namespaces": namespaces_for_integrations(search["integrations"])
+            })
+            cache_keys.append(cache_key)
+            cached_results = search_cache.get(cache_key, generation)
+            batch_results.append(None if cached_results is None else {
+                "query": search["query"],
+                "results": cached_results,
+                "total_results": len(cached_results),
+                "cached": True
+            })
+        misses = [position for position, result in enumerate(batch_results) if result is None]
+
+        embedding_ms = 0.0
+        queries_ms = 0.0
+        if misses:
+            if not check_index_health():
+                return jsonify({
+                    "error": "Pinecone index is currently unavailable. Please try again later.",
+                    "details": "The vector database is experiencing connectivity issues."
+                }), 503
+
+            # Embed every uncached query in one request
+            embedding_started = time.perf_counter()
+            embeddings = dict(zip(misses, get_embeddings([searches[position]["query"] for position in misses])))
+            embedding_ms = (time.perf_counter() - embedding_started) * 1000
+
+            def run_search(position):
+                search = searches[position]
+                query_started = time.perf_counter()
+                try:
+                    results = query_chunks(embeddings[position], top_k=search["top_k"],
+                                           metadata_filter=search["filter"],
+                                           mmr=search["mmr"], mmr_lambda=search["mmr_lambda"],
+                                           namespaces=namespaces_for_integrations(search["integrations"]))
+                    formatted_results = format_matches(results.matches)
+                    search_cache.put(cache_keys[position], generation, formatted_results)
+                    return {
+                        "query": search["query"],
+                        "results": formatted_results,
+                        "total_results": len(formatted_results),
+                        "cached": False,
+                        "query_ms": round((time.perf_counter() - query_started) * 1000, 1)
+                    }
+                except Exception as e:
+                    logger.warning(f"Batch search failed for '{search['query'][:50]}': {e}")
+                    return {
+                        "query": search["query"],
+                        "error": f"Search failed: {str(e)}",
+                        "query_ms": round((time.perf_counter() - query_started) * 1000, 1)
+                    }
+
+            # Run the vector queries with bounded parallelism
+            queries_started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, min(SEARCH_BATCH_CONCURRENCY, len(misses)))) as executor:
+                for position, result in zip(misses, executor.map(run_search, misses)):
+                    batch_results[position] = result
+            queries_ms = (time.perf_counter() - queries_started) * 1000
+
+        total_results = sum(result.get("total_results", 0) for result in batch_results)
+        logger.info(f"Batch search completed: {len(searches)} queries, {total_results} results")
+
+        # Log search activity once for the whole batch
+        log_search_activity(f"{len(searches)} batched queries", total_results)
+
+        return jsonify({
+            "status": "success",
+            "results": batch_results,
+            "total_queries": len(searches),
+            "failed_queries": sum(1 for result in batch_results if "error" in result),
+            "cached_queries": len(searches) - len(misses),
+            "timings": {
+                "embedding_ms": round(embedding_ms, 1),
+                "queries_ms": round(queries_ms, 1),
+                "total_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        })
+
+    except Exception as e:
+        error_msg = str(e)
+        logger.error(f"Batch search failed: {error_msg}")
+        return search_error_response(error_msg)
+
+@search_bp.route("/search/cache", methods=["GET"])
+def search_cache_stats():
+    """Get search result cache statistics"""
+    return jsonify({
+        "status": "success",
+        "cache": search_cache.stats()
+    })
@@ -1,20 +1,138 @@
 import json
 import os
+import atexit
+import logging
+import threading
+from collections import Counter, deque
 from datetime import datetime
 from typing import List, Dict, Any
+from dotenv import load_dotenv
+
+from .db import get_connection
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Activities kept in the database; older ones are pruned after each write
+ACTIVITY_LOG_RETENTION = int(os.getenv("ACTIVITY_LOG_RETENTION", 1000))
+
+# Recent activities kept in memory, and how often (seconds) or after how many new activities they are written
+ACTIVITY_BUFFER_SIZE = int(os.getenv("ACTIVITY_BUFFER_SIZE", 1000))
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", 1.0))
+ACTIVITY_FLUSH_BATCH = int(os.getenv("ACTIVITY_FLUSH_BATCH", 100))
+
+# File-based activity logs of earlier versions, imported into the database on startup
+LEGACY_ACTIVITY_FILES = ("activity_log.json", "activity_log.jsonl.history", "activity_log.jsonl")
+
+def _read_legacy_activities(path: str) -> List[Dict[str, Any]]:
+    """Read the activities of a legacy JSON array or JSON-lines log, skipping malformed entries"""
+    with open(path, 'r') as f:
+        content = f.read()
+    try:
+        activities = json.loads(content)
+        if not isinstance(activities, list):
+            activities = [activities]
+    except ValueError:
+        activities = []
+        for line in content.splitlines():
+            try:
+                activities.append(json.loads(line))
+            except ValueError:
+                continue
+    return [activity for activity in activities if isinstance(activity, dict)]
 
 class ActivityTracker:
-    """Track project activities for timeline display"""
+    """Track project activities for timeline display
+    
+    Activities are stored in SQLite in WAL mode, so every worker process shares one
+    timeline and concurrent writers never overwrite each other. log_activity only adds the
+    activity to an in-memory ring buffer; a background writer inserts new activities in one
+    transaction per batch, every ACTIVITY_FLUSH_INTERVAL seconds, after ACTIVITY_FLUSH_BATCH
+    activities and at shutdown.
+    """
     
-    def __init__(self, activity_file: str = "activity_log.json"):
-        self.activity_file = activity_file
-        self._ensure_activity_file()
+    def __init__(self, retention: int = ACTIVITY_LOG_RETENTION, buffer_size: int = ACTIVITY_BUFFER_SIZE,
+                 flush_interval: float = ACTIVITY_FLUSH_INTERVAL, flush_batch: int = ACTIVITY_FLUSH_BATCH):
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        
+        # _lock serializes writes and is always taken before _buffer_lock
+        self._lock = threading.Lock()
+        self._ensure_schema()
+        self._migrate_legacy_logs()
+        
+        # Ring buffer of (sequence number, activity); activities up to _written are in the database
+        self._buffer = deque(maxlen=buffer_size)
+        self._buffer_lock = threading.Lock()
+        self._sequence = 0
+        self._written = 0
+        self._dropped = 0
+        
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run_writer, name="activity-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
     
-    def _ensure_activity_file(self):
-        """Ensure activity log file exists"""
-        if not os.path.exists(self.activity_file):
-            with open(self.activity_file, 'w') as f:
-                json.dump([], f)
+    def _ensure_schema(self):
+        """Switch the database to WAL mode and create the activities table if it does not exist"""
+        with get_connection() as conn:
+            # WAL lets readers run alongside the single writer; the setting persists in the database file
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS activities (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    details TEXT NOT NULL DEFAULT '{}'
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_activities_type ON activities (type, id)")
+    
+    def _migrate_legacy_logs(self):
+        """Import activities from the file-based logs of earlier versions, once"""
+        for path in LEGACY_ACTIVITY_FILES:
+            # Claim the file with an atomic rename first, so only one worker ever imports it
+            claimed_path = f"{path}.{os.getpid()}.claim"
+            try:
+                os.rename(path, claimed_path)
+            except FileNotFoundError:
+                # No legacy log, or another worker claimed it first
+                continue
+            except OSError as e:
+                logger.warning(f"Could not claim activities log {path}: {e}")
+                continue
+            try:
+                activities = _read_legacy_activities(claimed_path)
+                activities.sort(key=lambda x: x.get('timestamp', ''))
+                self._insert(activities[-self.retention:])
+                os.replace(claimed_path, f"{path}.migrated")
+                logger.info(f"Imported {len(activities)} activities from {path}")
+            except OSError as e:
+                logger.warning(f"Could not import activities from {claimed_path}: {e}")
+    
+    def _insert(self, activities: List[Dict[str, Any]]):
+        """Insert activities in one transaction and prune the oldest beyond the retention limit"""
+        with get_connection() as conn:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executemany(
+                "INSERT INTO activities (timestamp, type, description, details) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        activity.get("timestamp", ""),
+                        activity.get("type", "system"),
+                        activity.get("description", ""),
+                        json.dumps(activity.get("details") or {}, default=str)
+                    )
+                    for activity in activities
+                ]
+            )
+            conn.execute(
+                "DELETE FROM activities WHERE id <= (SELECT MAX(id) FROM activities) - ?", (self.retention,)
+            )
     
     def log_activity(self, activity_type: str, description: str, details: Dict[str, Any] = None):
         """Log a new activity"""
@@ -25,42 +143,110 @@ class ActivityTracker:
             "details": details or {}
         }
         
-        # Read existing activities
-        try:
-            with open(self.activity_file, 'r') as f:
-                activities = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            activities = []
+        # If the writer has fallen a whole buffer behind, write in the caller instead of losing activities
+        with self._buffer_lock:
+            full = len(self._buffer) == self._buffer.maxlen and self._buffer[0][0] > self._written
+        if full:
+            self.flush()
         
-        # Add new activity
-        activities.append(activity)
+        # Otherwise there is no disk I/O on the request path; the writer is woken early once a batch is ready
+        with self._buffer_lock:
+            self._sequence += 1
+            self._buffer.append((self._sequence, activity))
+            unwritten = self._sequence - self._written
+        if unwritten >= self.flush_batch:
+            self._wake.set()
+    
+    def _run_writer(self):
+        """Flush buffered activities every flush_interval seconds or when woken"""
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to write activities: {e}")
+    
+    def _unwritten(self) -> List[Dict[str, Any]]:
+        """Buffered activities not written yet, newest first (caller holds _buffer_lock)"""
+        unwritten = []
+        for sequence, activity in reversed(self._buffer):
+            if sequence <= self._written:
+                break
+            unwritten.append((sequence, activity))
+        return unwritten
+    
+    def flush(self):
+        """Insert every buffered activity not written yet in one transaction"""
+        with self._lock:
+            with self._buffer_lock:
+                pending = self._unwritten()
+                if not pending:
+                    return
+                pending.reverse()
+                # Activities overwritten in the ring before they were written are lost
+                self._dropped += pending[0][0] - self._written - 1
+            
+            self._insert([activity for _, activity in pending])
+            with self._buffer_lock:
+                self._written = pending[-1][0]
+    
+    def close(self):
+        """Stop the writer and write the remaining activities"""
+        self._closed = True
+        self._wake.set()
+        if self._writer.is_alive() and self._writer is not threading.current_thread():
+            self._writer.join(timeout=5)
+        self.flush()
+    
+    def get_activities(self, limit: int = 20, activity_type: str = None) -> List[Dict[str, Any]]:
+        """Get recent activities of every worker (newest first), including this process's unwritten ones"""
+        type_filter = "" if activity_type is None else "WHERE type = ? "
+        type_params = () if activity_type is None else (activity_type,)
         
-        # Keep only last 100 activities
-        if len(activities) > 100:
-            activities = activities[-100:]
+        # Only the buffer snapshot is taken under a lock; the query runs without blocking loggers or the writer
+        with self._buffer_lock:
+            unwritten = [
+                activity for _, activity in self._unwritten()
+                if activity_type is None or activity["type"] == activity_type
+            ][:limit]
+        with get_connection() as conn:
+            rows = conn.execute(
+                f"SELECT timestamp, type, description, details FROM activities {type_filter}"
+                f"ORDER BY id DESC LIMIT ?",
+                (*type_params, limit)
+            ).fetchall()
         
-        # Write back to file
-        with open(self.activity_file, 'w') as f:
-            json.dump(activities, f, indent=2)
-    
-    def get_activities(self, limit: int = 20) -> List[Dict[str, Any]]:
-        """Get recent activities"""
-        try:
-            with open(self.activity_file, 'r') as f:
-                activities = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+        activities = [
+            {**dict(row), "details": json.loads(row["details"])}
+            for row in rows
+        ]
+        # Snapshotted activities the writer inserted before the query ran are already in the rows
+        written = Counter((row["timestamp"], row["type"], row["description"]) for row in rows)
+        for activity in unwritten:
+            key = (activity["timestamp"], activity["type"], activity["description"])
+            if written[key] > 0:
+                written[key] -= 1
+            else:
+                activities.append(activity)
         
-        # Sort by timestamp (newest first)
+        # Other workers' activities interleave with this process's unwritten ones
         activities.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        
         return activities[:limit]
     
     def get_activities_by_type(self, activity_type: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get activities filtered by type"""
-        activities = self.get_activities(limit * 2)  # Get more to filter
-        filtered = [a for a in activities if a.get('type') == activity_type]
-        return filtered[:limit]
+        return self.get_activities(limit, activity_type=activity_type)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get buffer counters: activities logged, not written yet and lost to a full buffer"""
+        with self._buffer_lock:
+            return {
+                "buffered": len(self._buffer),
+                "logged": self._sequence,
+                "unwritten": self._sequence - self._written,
+                "dropped": self._dropped
+            }
 
 # Global activity tracker instance
 activity_tracker = ActivityTracker()
@@ -1,16 +1,35 @@
 import re
+from typing import Iterable, Iterator
+
+SPLIT_PATTERN = re.compile(r'\n{2,}|\.\s+')
 
 def chunk_text(text, max_tokens=300):
     # Simple sentence/paragraph-based chunking
-    chunks = re.split(r'\n{2,}|\.\s+', text)
-    result = []
+    return list(chunk_text_stream([text], max_tokens=max_tokens))
+
+def chunk_text_stream(pieces: Iterable[str], max_tokens=300) -> Iterator[str]:
+    """Chunk a stream of text pieces (e.g. PDF pages), yielding chunks as soon as they are complete"""
     current = ""
-    for chunk in chunks:
+    for chunk in _split_stream(pieces):
         if len(current + chunk) < max_tokens * 4:  # estimate 1 token ≈ 4 characters
             current += chunk + " "
         else:
-            result.append(current.strip())
+            yield current.strip()
             current = chunk + " "
     if current:
-        result.append(current.strip())
-    return result
+        yield current.strip()
+
+def _split_stream(pieces: Iterable[str]) -> Iterator[str]:
+    """Split a stream of text pieces on sentence/paragraph boundaries"""
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        start = 0
+        for match in SPLIT_PATTERN.finditer(buffer):
+            # A separator touching the end of the buffer may continue in the next piece
+            if match.end() == len(buffer):
+                break
+            yield buffer[start:match.start()]
+            start = match.end()
+        buffer = buffer[start:]
+    yield from SPLIT_PATTERN.split(buffer)
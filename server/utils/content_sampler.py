@@ -0,0 +1,203 @@
+import os
+import logging
+import threading
+import numpy as np
+from typing import AbstractSet, List, Dict, Any, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+
+from .llm_provider import embedding_provider, EMBEDDING_DIMENSION
+from .pinecone_utils import sample_chunk_vectors, fetch_chunks, get_kb_generation
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Clusters drawn from, random probe vectors added to the topic probes, and chunks sampled per probe
+FLASHCARD_CLUSTERS = int(os.getenv("FLASHCARD_CLUSTERS", 12))
+FLASHCARD_SAMPLE_RANDOM_PROBES = int(os.getenv("FLASHCARD_SAMPLE_RANDOM_PROBES", 8))
+FLASHCARD_SAMPLE_PER_PROBE = int(os.getenv("FLASHCARD_SAMPLE_PER_PROBE", 50))
+
+# Mini-batch k-means settings
+KMEANS_BATCH_SIZE = 256
+KMEANS_ITERATIONS = 50
+
+def chunk_key(namespace: str, vector_id: str) -> str:
+    """Identifier of a chunk across namespaces, used to tell which chunks cards were generated from"""
+    return f"{namespace}/{vector_id}"
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def mini_batch_kmeans(vectors: np.ndarray, k: int, batch_size: int = KMEANS_BATCH_SIZE,
+                      iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster unit vectors by cosine similarity with mini-batch (spherical) k-means
+
+    Args:
+        vectors: (n, d) array of embeddings
+        k: Number of clusters (capped at n)
+        batch_size: Vectors sampled per update step
+        iterations: Number of update steps
+        seed: Seed of the random initialization and batches
+
+    Returns:
+        The (k, d) unit centroids and the cluster of every vector
+    """
+    rng = np.random.default_rng(seed)
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    k = max(1, min(k, len(vectors)))
+
+    # k-means++ seeding: each next centroid is drawn proportionally to its distance from the chosen ones
+    centroids = [vectors[rng.integers(len(vectors))]]
+    distances = 1 - vectors @ centroids[0]
+    for _ in range(1, k):
+        weights = np.maximum(distances, 0)
+        total = float(weights.sum())
+        pick = rng.choice(len(vectors), p=weights / total) if total > 0 else rng.integers(len(vectors))
+        centroids.append(vectors[pick])
+        distances = np.minimum(distances, 1 - vectors @ vectors[pick])
+    centroids = np.array(centroids)
+
+    # Each centroid moves towards its batch members with a per-centroid learning rate of 1 / count
+    counts = np.zeros(k)
+    for _ in range(iterations):
+        batch = vectors[rng.integers(len(vectors), size=min(batch_size, len(vectors)))]
+        assignments = np.argmax(batch @ centroids.T, axis=1)
+        for cluster in np.unique(assignments):
+            members = batch[assignments == cluster]
+            counts[cluster] += len(members)
+            rate = len(members) / counts[cluster]
+            centroids[cluster] = (1 - rate) * centroids[cluster] + rate * members.mean(axis=0)
+        centroids = _normalize(centroids)
+
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+class ContentSampler:
+    """Chunks drawn round-robin across embedding clusters, so flashcards cover distinct parts of the knowledge base
+
+    The clustering of a sample of chunk vectors is cached until the knowledge-base generation
+    (or the embedding model) changes. A cursor kept with it makes every draw continue where the
+    previous one stopped; once every cluster is used up, drawing starts over from the top.
+    """
+
+    def __init__(self, clusters: int = FLASHCARD_CLUSTERS):
+        self.clusters = clusters
+        self._cached = None
+        self._lock = threading.Lock()
+
+    def _cluster(self, probe_vectors: Sequence[Sequence[float]]) -> Optional[Dict[str, Any]]:
+        """Sample chunk vectors and cluster them, returning per-cluster members ordered by closeness to the centroid"""
+        generation = get_kb_generation()
+        rng = np.random.default_rng(generation)
+        random_probes = _normalize(rng.standard_normal((FLASHCARD_SAMPLE_RANDOM_PROBES, EMBEDDING_DIMENSION)))
+        probes = [*probe_vectors, *random_probes.tolist()]
+
+        samples = sample_chunk_vectors(probes, per_probe=FLASHCARD_SAMPLE_PER_PROBE)
+        if not samples:
+            return None
+
+        vectors = np.asarray([values for _, _, values in samples], dtype=np.float32)
+        centroids, assignments = mini_batch_kmeans(vectors, self.clusters, seed=generation)
+        similarities = np.einsum("ij,ij->i", _normalize(vectors), centroids[assignments])
+
+        members = []
+        for cluster in range(len(centroids)):
+            indices = np.flatnonzero(assignments == cluster)
+            indices = indices[np.argsort(-similarities[indices])]
+            members.append([(samples[i][0], samples[i][1], float(similarities[i])) for i in indices])
+
+        logger.info(f"Clustered {len(samples)} sampled chunks into {len(centroids)} clusters (generation {generation})")
+        return {"centroids": centroids, "members": [cluster for cluster in members if cluster],
+                "cluster_ids": [i for i, cluster in enumerate(members) if cluster]}
+
+    def _get_cached(self, probe_vectors: Sequence[Sequence[float]]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Get the clustering of the current generation and its draw cursor (caller holds the lock)"""
+        key = (get_kb_generation(), embedding_provider.embedding_id)
+        if self._cached is None or self._cached[0] != key:
+            clusters = self._cluster(probe_vectors)
+            if clusters is None:
+                return None
+            # A new clustering starts with a fresh cursor: next member per cluster and next cluster to visit
+            cursor = {"positions": [0] * len(clusters["members"]), "next_cluster": 0,
+                      "remaining": sum(len(members) for members in clusters["members"])}
+            self._cached = (key, clusters, cursor)
+        return self._cached[1], self._cached[2]
+
+    def get_clusters(self, probe_vectors: Sequence[Sequence[float]]) -> Optional[Dict[str, Any]]:
+        """Get the cached clustering of the current generation, computing it on first use"""
+        with self._lock:
+            cached = self._get_cached(probe_vectors)
+        return cached[0] if cached else None
+
+    def _draw(self, clusters: Dict[str, Any], cursor: Dict[str, Any], count: int,
+              exclude: AbstractSet[str] = frozenset()) -> List[tuple]:
+        """Advance the cursor round-robin across clusters, returning up to count distinct members (caller holds the lock)"""
+        members = clusters["members"]
+        total = sum(len(cluster_members) for cluster_members in members)
+        drawn = []
+        drawn_ids = set()
+        # At most one cycle of steps; a member reached again after the wrap-around is skipped
+        for _ in range(total):
+            if len(drawn) >= count:
+                break
+            if cursor["remaining"] == 0:
+                cursor["positions"] = [0] * len(members)
+                cursor["remaining"] = total
+            # Skip clusters whose members are used up in this cycle
+            cluster = cursor["next_cluster"]
+            while cursor["positions"][cluster] >= len(members[cluster]):
+                cluster = (cluster + 1) % len(members)
+            member = members[cluster][cursor["positions"][cluster]]
+            if member[:2] not in drawn_ids and chunk_key(*member[:2]) not in exclude:
+                drawn.append((clusters["cluster_ids"][cluster], *member))
+                drawn_ids.add(member[:2])
+            cursor["positions"][cluster] += 1
+            cursor["remaining"] -= 1
+            cursor["next_cluster"] = (cluster + 1) % len(members)
+        return drawn
+
+    def sample(self, count: int, probe_vectors: Sequence[Sequence[float]],
+               exclude: Optional[AbstractSet[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Draw the next count chunks round-robin across clusters, closest to each centroid first
+
+        Args:
+            count: Number of chunks to draw
+            probe_vectors: Query vectors (e.g. topic embeddings) used, with random ones, to sample the index
+            exclude: Chunk keys (see chunk_key) to pass over, e.g. chunks that already have a card
+
+        Returns:
+            Content entries (text, source, title, score, query, query_embedding, chunk_id) in draw order;
+            score is the similarity to the cluster centroid, which is used as the query embedding
+        """
+        with self._lock:
+            cached = self._get_cached(probe_vectors)
+            if cached is None:
+                return []
+            clusters, cursor = cached
+            drawn = self._draw(clusters, cursor, count, exclude or frozenset())
+
+        ids_by_namespace = {}
+        for _, namespace, vector_id, _ in drawn:
+            ids_by_namespace.setdefault(namespace, []).append(vector_id)
+        chunks = {namespace: fetch_chunks(ids, namespace) for namespace, ids in ids_by_namespace.items()}
+
+        content = []
+        for cluster, namespace, vector_id, similarity in drawn:
+            metadata = chunks[namespace].get(vector_id)
+            if not metadata or not metadata.get('text'):
+                continue
+            content.append({
+                'text': metadata['text'],
+                'source': metadata.get('source', 'Unknown'),
+                'title': metadata.get('title', 'Unknown'),
+                'score': similarity,
+                'query': metadata.get('title', ''),
+                'query_embedding': clusters["centroids"][cluster].tolist(),
+                'cluster': cluster,
+                'chunk_id': chunk_key(namespace, vector_id)
+            })
+        return content
+
+# Global content sampler instance
+content_sampler = ContentSampler()
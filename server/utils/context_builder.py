@@ -0,0 +1,190 @@
+import os
+import logging
+from typing import List, Dict, Any, Optional
+from dotenv import load_dotenv
+
+from .enhanced_chunker import generate_chunk_id
+from .pinecone_utils import fetch_chunks, namespace_for
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Token budget for the context of an /ask prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 2000))
+
+# Neighbors are fetched for matches scoring at least this fraction of the best match
+CONTEXT_NEIGHBOR_SCORE_RATIO = float(os.getenv("CONTEXT_NEIGHBOR_SCORE_RATIO", 0.85))
+
+# Score given to a fetched neighbor, relative to the match it was fetched for
+NEIGHBOR_SCORE_DECAY = 0.9
+
+# Shortest and longest chunk overlap that is detected and trimmed when merging
+MIN_OVERLAP_CHARS = 8
+MAX_OVERLAP_CHARS = 512
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text (1 token ≈ 4 characters, as in the chunkers)"""
+    return (len(text) + 3) // 4
+
+def _match_to_chunk(match_id: str, score: float, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a context chunk from a match or fetched vector"""
+    return {
+        "id": match_id,
+        "score": score,
+        "text": (metadata.get("text") or "").strip(),
+        "source": metadata.get("source", ""),
+        "chunk_index": metadata.get("chunk_index"),
+        "start_pos": metadata.get("start_pos"),
+        "end_pos": metadata.get("end_pos"),
+        "metadata": metadata
+    }
+
+def _fetch_neighbors(chunks: Dict[str, Dict[str, Any]], score_ratio: float) -> int:
+    """Fetch the previous and next chunk of every high-scoring match, returning how many were added"""
+    best_score = max(chunk["score"] for chunk in chunks.values())
+    wanted = {}
+    for chunk in list(chunks.values()):
+        if chunk["score"] < best_score * score_ratio:
+            continue
+        if not chunk["source"] or not isinstance(chunk["chunk_index"], (int, float)):
+            continue
+        # Neighbors share the deterministic source/index ID scheme
+        if chunk["id"] != generate_chunk_id(chunk["source"], int(chunk["chunk_index"])):
+            continue
+        namespace = namespace_for(chunk["metadata"])
+        for neighbor_index in (int(chunk["chunk_index"]) - 1, int(chunk["chunk_index"]) + 1):
+            if neighbor_index < 0:
+                continue
+            neighbor_id = generate_chunk_id(chunk["source"], neighbor_index)
+            if neighbor_id in chunks:
+                continue
+            score = chunk["score"] * NEIGHBOR_SCORE_DECAY
+            wanted.setdefault(namespace, {})
+            wanted[namespace][neighbor_id] = max(score, wanted[namespace].get(neighbor_id, 0.0))
+
+    added = 0
+    for namespace, neighbor_scores in wanted.items():
+        try:
+            fetched = fetch_chunks(list(neighbor_scores), namespace)
+        except Exception as e:
+            logger.warning(f"Neighbor fetch failed for namespace '{namespace}': {str(e)}")
+            continue
+        for neighbor_id, metadata in fetched.items():
+            if neighbor_id not in chunks and metadata.get("text"):
+                chunks[neighbor_id] = _match_to_chunk(neighbor_id, neighbor_scores[neighbor_id], metadata)
+                added += 1
+    return added
+
+def _trim_overlap(previous: str, following: str) -> str:
+    """Drop the start of following that repeats the end of previous"""
+    longest = min(len(previous), len(following), MAX_OVERLAP_CHARS)
+    for length in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:length]):
+            return following[length:].lstrip()
+    return following
+
+def _is_adjacent(previous: Dict[str, Any], following: Dict[str, Any]) -> bool:
+    """Whether two chunks of the same source are consecutive in the document"""
+    if previous["chunk_index"] is None or following["chunk_index"] is None:
+        return False
+    if following["chunk_index"] == previous["chunk_index"] + 1:
+        return True
+    # Chunks without consecutive indexes can still overlap by position
+    if previous["end_pos"] is not None and following["start_pos"] is not None:
+        return following["chunk_index"] > previous["chunk_index"] and following["start_pos"] <= previous["end_pos"]
+    return False
+
+def _build_spans(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge runs of adjacent chunks from the same source into spans"""
+    by_source = {}
+    for chunk in chunks:
+        by_source.setdefault(chunk["source"], []).append(chunk)
+
+    spans = []
+    for source, source_chunks in by_source.items():
+        ordered = sorted(source_chunks, key=lambda c: (c["chunk_index"] is None, c["chunk_index"] or 0))
+        current = None
+        for chunk in ordered:
+            if current and _is_adjacent(current["chunks"][-1], chunk):
+                current["text"] += " " + _trim_overlap(current["text"], chunk["text"])
+                current["chunks"].append(chunk)
+                current["score"] = max(current["score"], chunk["score"])
+            else:
+                current = {"source": source, "text": chunk["text"], "chunks": [chunk], "score": chunk["score"]}
+                spans.append(current)
+    return spans
+
+def build_context(matches: List[Any], token_budget: Optional[int] = None,
+                  expand_neighbors: bool = True, neighbor_score_ratio: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Pack retrieved chunks into a token-budgeted prompt context
+
+    Args:
+        matches: Query matches with id, score and metadata
+        token_budget: Maximum context tokens (defaults to CONTEXT_TOKEN_BUDGET)
+        expand_neighbors: Fetch the chunks around high-scoring matches
+        neighbor_score_ratio: Fraction of the best score a match needs for neighbor expansion
+
+    Returns:
+        Dictionary with the context text, its span texts, its token estimate and the chunks packed
+    """
+    token_budget = token_budget or CONTEXT_TOKEN_BUDGET
+    if neighbor_score_ratio is None:
+        neighbor_score_ratio = CONTEXT_NEIGHBOR_SCORE_RATIO
+
+    chunks = {}
+    for match in matches:
+        metadata = match.metadata or {}
+        if match.id not in chunks and metadata.get("text"):
+            chunks[match.id] = _match_to_chunk(match.id, match.score, metadata)
+
+    neighbors_added = _fetch_neighbors(chunks, neighbor_score_ratio) if expand_neighbors and chunks else 0
+
+    # Greedily pack the best spans; a span that does not fit falls back to its best chunk
+    packed = []
+    tokens_used = 0
+    for span in sorted(_build_spans(list(chunks.values())), key=lambda s: s["score"], reverse=True):
+        candidates = [span]
+        if len(span["chunks"]) > 1:
+            best_chunk = max(span["chunks"], key=lambda c: c["score"])
+            candidates.append({"source": span["source"], "text": best_chunk["text"],
+                               "chunks": [best_chunk], "score": best_chunk["score"]})
+        for candidate in candidates:
+            tokens = estimate_tokens(candidate["text"])
+            if tokens_used + tokens <= token_budget:
+                candidate["tokens"] = tokens
+                packed.append(candidate)
+                tokens_used += tokens
+                break
+
+    # Never return an empty context when something was retrieved
+    if not packed and chunks:
+        best_chunk = max(chunks.values(), key=lambda c: c["score"])
+        text = best_chunk["text"][:token_budget * 4]
+        packed.append({"source": best_chunk["source"], "text": text, "chunks": [best_chunk],
+                       "score": best_chunk["score"], "tokens": estimate_tokens(text)})
+        tokens_used = packed[0]["tokens"]
+
+    chunks_packed = sum(len(span["chunks"]) for span in packed)
+    logger.info(f"Packed {chunks_packed} of {len(chunks)} chunks into {tokens_used}/{token_budget} tokens "
+                f"({neighbors_added} neighbors fetched)")
+
+    return {
+        "context": "\n\n".join(span["text"] for span in packed),
+        "texts": [span["text"] for span in packed],
+        "tokens": tokens_used,
+        "token_budget": token_budget,
+        "chunks_packed": chunks_packed,
+        "chunks_dropped": len(chunks) - chunks_packed,
+        "neighbors_added": neighbors_added,
+        "spans": [
+            {
+                "source": span["source"],
+                "chunk_ids": [chunk["id"] for chunk in span["chunks"]],
+                "score": span["score"],
+                "tokens": span["tokens"]
+            }
+            for span in packed
+        ]
+    }
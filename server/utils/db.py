@@ -0,0 +1,29 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_DATABASE_URL = "sqlite:///ktp.db"
+
+def get_database_path() -> str:
+    """Resolve the SQLite file path from DATABASE_URL"""
+    database_url = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+    if database_url.startswith("sqlite:///"):
+        return database_url[len("sqlite:///"):]
+    return database_url
+
+@contextmanager
+def get_connection():
+    """Open a SQLite connection, committing on success and rolling back on error"""
+    conn = sqlite3.connect(get_database_path(), timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
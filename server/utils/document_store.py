@@ -0,0 +1,81 @@
+import json
+import zlib
+from typing import Dict, Any, List, Tuple
+
+from .db import get_connection
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+class DocumentStore:
+    """Chunk text and descriptive metadata stored locally, keyed by namespace and vector ID"""
+
+    def __init__(self):
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Create the documents table if it does not exist"""
+        with get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    namespace TEXT NOT NULL,
+                    vector_id TEXT NOT NULL,
+                    text BLOB NOT NULL,
+                    metadata TEXT NOT NULL DEFAULT '{}',
+                    PRIMARY KEY (namespace, vector_id)
+                )
+            """)
+
+    def put_many(self, namespace: str, documents: List[Tuple[str, str, Dict[str, Any]]]):
+        """Store (vector ID, text, metadata) documents, compressing the text"""
+        with get_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO documents (namespace, vector_id, text, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (namespace, vector_id, zlib.compress(text.encode('utf-8')), json.dumps(metadata, default=str))
+                    for vector_id, text, metadata in documents
+                ]
+            )
+
+    def get_many(self, namespace: str, vector_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the metadata (including "text") of many vectors, skipping IDs that are not stored"""
+        documents = {}
+        with get_connection() as conn:
+            for start in range(0, len(vector_ids), LOOKUP_BATCH_SIZE):
+                batch = vector_ids[start:start + LOOKUP_BATCH_SIZE]
+                rows = conn.execute(
+                    f"SELECT vector_id, text, metadata FROM documents WHERE namespace = ? "
+                    f"AND vector_id IN ({', '.join('?' * len(batch))})",
+                    [namespace, *batch]
+                ).fetchall()
+                for row in rows:
+                    documents[row["vector_id"]] = {
+                        **json.loads(row["metadata"]),
+                        "text": zlib.decompress(row["text"]).decode('utf-8')
+                    }
+        return documents
+
+    def delete_many(self, namespace: str, vector_ids: List[str]):
+        """Delete the documents of many vectors"""
+        with get_connection() as conn:
+            conn.executemany(
+                "DELETE FROM documents WHERE namespace = ? AND vector_id = ?",
+                [(namespace, vector_id) for vector_id in vector_ids]
+            )
+
+    def delete_namespace(self, namespace: str) -> int:
+        """Delete every document in a namespace, returning how many were removed"""
+        with get_connection() as conn:
+            cursor = conn.execute("DELETE FROM documents WHERE namespace = ?", (namespace,))
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get document counts and stored (compressed) text size"""
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS documents, COALESCE(SUM(LENGTH(text)), 0) AS text_bytes FROM documents"
+            ).fetchone()
+        return {"documents": row["documents"], "compressed_text_bytes": row["text_bytes"]}
+
+# Global document store instance
+document_store = DocumentStore()
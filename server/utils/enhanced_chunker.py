@@ -1,6 +1,5 @@
 import re
 import hashlib
-import uuid
 from typing import List, Dict, Any
 from datetime import datetime
 
@@ -10,7 +9,12 @@ def generate_content_hash(content: str) -> str:
     normalized = re.sub(r'\s+', ' ', content.strip().lower())
     return hashlib.md5(normalized.encode()).hexdigest()
 
-def chunk_text(text: str, max_tokens: int = 300, overlap: int = 50) -> List[Dict[str, Any]]:
+def generate_chunk_id(source: str, chunk_index: int) -> str:
+    """Generate a deterministic vector ID from a source URI and chunk ordinal"""
+    source_hash = hashlib.sha1(source.encode()).hexdigest()[:24]
+    return f"{source_hash}-{chunk_index}"
+
+def chunk_text(text: str, max_tokens: int = 300, overlap: int = 50, source: str = None) -> List[Dict[str, Any]]:
     """
     Enhanced chunking with metadata and deduplication support
     
@@ -18,6 +22,7 @@ def chunk_text(text: str, max_tokens: int = 300, overlap: int = 50) -> List[Dict
         text: Text to chunk
         max_tokens: Maximum tokens per chunk
         overlap: Overlap between chunks in characters
+        source: Source URI used to derive deterministic chunk IDs
     
     Returns:
         List of chunk dictionaries with metadata
@@ -45,10 +50,11 @@ def chunk_text(text: str, max_tokens: int = 300, overlap: int = 50) -> List[Dict
         
         if estimated_tokens > max_tokens and current_chunk:
             # Finalize current chunk
+            content_hash = generate_content_hash(current_chunk.strip())
             chunk_data = {
-                "id": str(uuid.uuid4()),
+                "id": generate_chunk_id(source, len(chunks)) if source else content_hash,
                 "text": current_chunk.strip(),
-                "content_hash": generate_content_hash(current_chunk.strip()),
+                "content_hash": content_hash,
                 "start_pos": chunk_start,
                 "end_pos": chunk_start + len(current_chunk),
                 "sentence_count": len([s for s in current_chunk.split('.') if s.strip()]),
@@ -66,10 +72,11 @@ def chunk_text(text: str, max_tokens: int = 300, overlap: int = 50) -> List[Dict
     
     # Add final chunk
     if current_chunk.strip():
+        content_hash = generate_content_hash(current_chunk.strip())
         chunk_data = {
-            "id": str(uuid.uuid4()),
+            "id": generate_chunk_id(source, len(chunks)) if source else content_hash,
             "text": current_chunk.strip(),
-            "content_hash": generate_content_hash(current_chunk.strip()),
+            "content_hash": content_hash,
             "start_pos": chunk_start,
             "end_pos": chunk_start + len(current_chunk),
             "sentence_count": len([s for s in current_chunk.split('.') if s.strip()]),
@@ -201,7 +208,7 @@ def process_integration_data(data_items: List[Dict[str, Any]], integration_type:
         }
         
         # Chunk the content
-        chunks = chunk_text(content, max_tokens=300, overlap=50)
+        chunks = chunk_text(content, max_tokens=300, overlap=50, source=source_info["source"])
         
         # Add source information to chunks
         for chunk in chunks:
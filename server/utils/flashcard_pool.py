@@ -0,0 +1,139 @@
+import os
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AbstractSet, Callable, List, Dict, Any, Optional
+from dotenv import load_dotenv
+
+from .llm_provider import embedding_provider
+from .pinecone_utils import get_kb_generation
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Ready-made cards kept per knowledge-base generation (0 disables the pool), refresh jobs run
+# concurrently, and cards generated per job
+FLASHCARD_POOL_SIZE = int(os.getenv("FLASHCARD_POOL_SIZE", 30))
+FLASHCARD_POOL_WORKERS = int(os.getenv("FLASHCARD_POOL_WORKERS", 2))
+FLASHCARD_POOL_BATCH = int(os.getenv("FLASHCARD_POOL_BATCH", 10))
+
+class FlashcardPool:
+    """Flashcards generated in the background ahead of requests, for the current knowledge-base generation
+
+    Cards of an older generation are dropped when the knowledge base changes. refresh() tops
+    the pool up without blocking; it is called after ingestion and whenever cards are taken.
+    Pooled cards are deduplicated by the chunk they were generated from, and every refill job
+    asks the generator to skip the chunks already in the pool.
+    """
+
+    def __init__(self, size: int = FLASHCARD_POOL_SIZE, workers: int = FLASHCARD_POOL_WORKERS,
+                 batch: int = FLASHCARD_POOL_BATCH):
+        self.size = size
+        self.batch = batch
+        self._generator: Optional[Callable[[int, AbstractSet[str]], List[Dict[str, Any]]]] = None
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers)) if size > 0 else None
+        self._workers = max(1, workers)
+        self._cards = deque()
+        self._card_keys = set()
+        self._key = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stats = {"served": 0, "generated": 0, "discarded": 0, "failed_jobs": 0}
+
+    def set_generator(self, generator: Callable[[int, AbstractSet[str]], List[Dict[str, Any]]]):
+        """Register the function that generates up to n cards from the knowledge base, skipping the given chunks"""
+        self._generator = generator
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None and self._generator is not None
+
+    def _sync_key(self):
+        """Drop the pooled cards if the knowledge base or embedding model changed (caller holds the lock)"""
+        key = (get_kb_generation(), embedding_provider.embedding_id)
+        if key != self._key:
+            self._stats["discarded"] += len(self._cards)
+            self._cards.clear()
+            self._card_keys.clear()
+            self._key = key
+        return key
+
+    @staticmethod
+    def _card_key(card: Dict[str, Any]) -> str:
+        """Source chunk of a card, or its question when the chunk is unknown"""
+        return card.get('chunk_id') or (card.get('question') or '').strip()
+
+    def refresh(self):
+        """Start enough background jobs to fill the pool for the current generation"""
+        if not self.enabled:
+            return
+        with self._lock:
+            key = self._sync_key()
+            jobs = 0
+            while (self._in_flight < self._workers and
+                   len(self._cards) + (self._in_flight + jobs) * self.batch < self.size):
+                self._in_flight += 1
+                jobs += 1
+        for _ in range(jobs):
+            self._executor.submit(self._run_job, key)
+
+    def _run_job(self, key):
+        """Generate one batch of cards and add the ones that are new and still current"""
+        added = 0
+        try:
+            with self._lock:
+                pooled_chunks = {card['chunk_id'] for card in self._cards if card.get('chunk_id')}
+            cards = self._generator(self.batch, pooled_chunks)
+            with self._lock:
+                if self._sync_key() == key:
+                    for card in cards:
+                        question = (card.get('question') or '').strip()
+                        card_key = self._card_key(card)
+                        if question and card_key not in self._card_keys and len(self._cards) < self.size:
+                            self._cards.append(card)
+                            self._card_keys.add(card_key)
+                            added += 1
+                    self._stats["generated"] += added
+        except Exception as e:
+            logger.error(f"Flashcard pool refresh failed: {e}")
+            with self._lock:
+                self._stats["failed_jobs"] += 1
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        # Keep filling while jobs make progress. A job that adds nothing, or whose cards went stale
+        # because ingestion is still changing the knowledge base, waits for the next trigger: the
+        # ingestion routes refresh once they finish, so a long ingest does not restart jobs per write
+        if added:
+            self.refresh()
+
+    def take(self, count: int) -> List[Dict[str, Any]]:
+        """Take up to count ready cards of the current generation, then top the pool up in the background"""
+        if not self.enabled:
+            return []
+        with self._lock:
+            self._sync_key()
+            cards = [self._cards.popleft() for _ in range(min(count, len(self._cards)))]
+            for card in cards:
+                self._card_keys.discard(self._card_key(card))
+            self._stats["served"] += len(cards)
+        self.refresh()
+        return cards
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool fill level and counters"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": self.size,
+                "ready": len(self._cards),
+                "refresh_jobs": self._in_flight,
+                "kb_generation": self._key[0] if self._key else None,
+                **self._stats
+            }
+
+# Global flashcard pool instance
+flashcard_pool = FlashcardPool()
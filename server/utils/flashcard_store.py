@@ -0,0 +1,335 @@
+import base64
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from .db import get_connection
+from .spaced_repetition import CardSchedule, review, quality_from_correctness, DEFAULT_EASE
+
+# Flashcard sets listed per page by default and at most
+FLASHCARD_SETS_PAGE_SIZE = 50
+FLASHCARD_SETS_MAX_PAGE_SIZE = 200
+
+# Due cards returned per call by default and at most
+DUE_CARDS_BATCH_SIZE = 20
+DUE_CARDS_MAX_BATCH_SIZE = 200
+
+# Spaced-repetition columns added to flashcards, with their definitions
+SCHEDULE_COLUMNS = {
+    "ease": f"REAL NOT NULL DEFAULT {DEFAULT_EASE}",
+    "interval_days": "INTEGER NOT NULL DEFAULT 0",
+    "repetitions": "INTEGER NOT NULL DEFAULT 0",
+    "due_at": "TEXT NOT NULL DEFAULT ''"
+}
+
+# Study modes: every card in set order, or the set's due cards, most overdue first
+STUDY_MODES = ("Review All", "Due Cards")
+
+CARD_COLUMNS = "id, set_id, question, answer, ease, interval_days, repetitions, due_at"
+
+class CardNotFoundError(Exception):
+    """The answered card does not belong to the session's flashcard set"""
+
+class FlashcardStore:
+    """Flashcard sets, their cards and study sessions, stored in SQLite with indexed lookups"""
+
+    def __init__(self):
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Create the flashcard tables and indexes if they do not exist"""
+        with get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS flashcard_sets (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    created_date TEXT NOT NULL,
+                    card_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # Listing walks sets newest first, resuming after the last (created_date, id) seen
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_flashcard_sets_created ON flashcard_sets (created_date, id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS flashcards (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    set_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    UNIQUE (set_id, position)
+                )
+            """)
+            # Stores created before spaced repetition lack the schedule columns
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(flashcards)")}
+            for column, definition in SCHEDULE_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE flashcards ADD COLUMN {column} {definition}")
+            # B-tree indexes ordered by due time: next due cards overall and per set are range scans
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_flashcards_due ON flashcards (due_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_flashcards_set_due ON flashcards (set_id, due_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS study_sessions (
+                    id TEXT PRIMARY KEY,
+                    set_id TEXT NOT NULL,
+                    study_mode TEXT NOT NULL,
+                    started_at TEXT NOT NULL,
+                    current_card INTEGER NOT NULL DEFAULT 0,
+                    correct_answers INTEGER NOT NULL DEFAULT 0,
+                    total_answered INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_study_sessions_set ON study_sessions (set_id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS study_answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    card_id INTEGER,
+                    answer TEXT,
+                    is_correct INTEGER NOT NULL,
+                    quality INTEGER,
+                    answered_at TEXT NOT NULL
+                )
+            """)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(study_answers)")}
+            if "quality" not in columns:
+                conn.execute("ALTER TABLE study_answers ADD COLUMN quality INTEGER")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_study_answers_session ON study_answers (session_id)")
+
+    @staticmethod
+    def encode_cursor(created_date: str, set_id: str) -> str:
+        """Build the listing cursor that resumes after a set"""
+        return base64.urlsafe_b64encode(json.dumps([created_date, set_id]).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Optional[Tuple[str, str]]:
+        """Get the (created_date, id) a cursor resumes after, or None if it is malformed"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            created_date, set_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            return str(created_date), str(set_id)
+        except (ValueError, TypeError, UnicodeDecodeError):
+            return None
+
+    @staticmethod
+    def _card(row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "set_id": row["set_id"],
+            "question": row["question"],
+            "answer": row["answer"],
+            "ease": row["ease"],
+            "interval_days": row["interval_days"],
+            "repetitions": row["repetitions"],
+            "due_at": row["due_at"]
+        }
+
+    @staticmethod
+    def _session(row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "set_id": row["set_id"],
+            "study_mode": row["study_mode"],
+            "started_at": row["started_at"],
+            "current_card": row["current_card"],
+            "correct_answers": row["correct_answers"],
+            "total_answered": row["total_answered"]
+        }
+
+    def _get_cards(self, conn, set_id: str) -> List[Dict[str, Any]]:
+        rows = conn.execute(
+            f"SELECT {CARD_COLUMNS} FROM flashcards WHERE set_id = ? ORDER BY position", (set_id,)
+        ).fetchall()
+        return [self._card(row) for row in rows]
+
+    def create_set(self, name: str, flashcards: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Store a new flashcard set, returning it with its cards (including their IDs)"""
+        set_id = str(uuid.uuid4())
+        created_date = datetime.now().isoformat()
+        with get_connection() as conn:
+            conn.execute(
+                "INSERT INTO flashcard_sets (id, name, created_date, card_count) VALUES (?, ?, ?, ?)",
+                (set_id, name, created_date, len(flashcards))
+            )
+            conn.executemany(
+                "INSERT INTO flashcards (set_id, position, question, answer, due_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    # New cards are due immediately
+                    (set_id, position, card.get("question", ""), card.get("answer", ""), created_date)
+                    for position, card in enumerate(flashcards)
+                ]
+            )
+            cards = self._get_cards(conn, set_id)
+        return {
+            "id": set_id,
+            "name": name,
+            "card_count": len(cards),
+            "created_date": created_date,
+            "flashcards": cards
+        }
+
+    def get_set(self, set_id: str) -> Optional[Dict[str, Any]]:
+        """Get a flashcard set with its cards, or None if it does not exist"""
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT id, name, created_date, card_count FROM flashcard_sets WHERE id = ?", (set_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            return {**dict(row), "flashcards": self._get_cards(conn, set_id)}
+
+    def list_sets(self, limit: int = FLASHCARD_SETS_PAGE_SIZE,
+                  cursor: Optional[Tuple[str, str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """List set summaries newest first, returning one page and the cursor of the next (or None)"""
+        limit = max(1, min(limit, FLASHCARD_SETS_MAX_PAGE_SIZE))
+        with get_connection() as conn:
+            if cursor is None:
+                rows = conn.execute(
+                    "SELECT id, name, created_date, card_count FROM flashcard_sets "
+                    "ORDER BY created_date DESC, id DESC LIMIT ?",
+                    (limit + 1,)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT id, name, created_date, card_count FROM flashcard_sets "
+                    "WHERE (created_date, id) < (?, ?) ORDER BY created_date DESC, id DESC LIMIT ?",
+                    (*cursor, limit + 1)
+                ).fetchall()
+        sets = [dict(row) for row in rows[:limit]]
+        next_cursor = self.encode_cursor(sets[-1]["created_date"], sets[-1]["id"]) if len(rows) > limit else None
+        return sets, next_cursor
+
+    def delete_set(self, set_id: str) -> Optional[Dict[str, Any]]:
+        """Delete a set with its cards, sessions and answers, returning its summary or None if it does not exist"""
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT id, name, created_date, card_count FROM flashcard_sets WHERE id = ?", (set_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "DELETE FROM study_answers WHERE session_id IN (SELECT id FROM study_sessions WHERE set_id = ?)",
+                (set_id,)
+            )
+            conn.execute("DELETE FROM study_sessions WHERE set_id = ?", (set_id,))
+            conn.execute("DELETE FROM flashcards WHERE set_id = ?", (set_id,))
+            conn.execute("DELETE FROM flashcard_sets WHERE id = ?", (set_id,))
+        return dict(row)
+
+    def count_sets(self) -> int:
+        """Get the number of stored flashcard sets"""
+        with get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) AS sets FROM flashcard_sets").fetchone()["sets"]
+
+    def _get_due_cards(self, conn, set_id: Optional[str], now: str, limit: int) -> List[Dict[str, Any]]:
+        """Read cards due at now, most overdue first, walking the due-time index"""
+        if set_id is None:
+            rows = conn.execute(
+                f"SELECT {CARD_COLUMNS} FROM flashcards WHERE due_at <= ? ORDER BY due_at LIMIT ?", (now, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                f"SELECT {CARD_COLUMNS} FROM flashcards WHERE set_id = ? AND due_at <= ? ORDER BY due_at LIMIT ?",
+                (set_id, now, limit)
+            ).fetchall()
+        return [self._card(row) for row in rows]
+
+    def get_due_cards(self, set_id: Optional[str] = None, limit: int = DUE_CARDS_BATCH_SIZE,
+                      within_hours: float = 0) -> Dict[str, Any]:
+        """Get the next batch of due cards (optionally of one set), most overdue first
+
+        Args:
+            set_id: Restrict to one flashcard set (all sets if None)
+            limit: Maximum number of cards returned
+            within_hours: Also include cards that fall due within this many hours
+
+        Returns:
+            Dictionary with the cards, the number due by the end of today and when the next
+            card not yet due falls due (None if there is none)
+        """
+        limit = max(1, min(limit, DUE_CARDS_MAX_BATCH_SIZE))
+        now = datetime.now()
+        due_by = (now + timedelta(hours=within_hours)).isoformat()
+        end_of_day = datetime.combine(now.date() + timedelta(days=1), datetime.min.time()).isoformat()
+        set_filter = "" if set_id is None else "set_id = ? AND "
+        set_params = () if set_id is None else (set_id,)
+
+        with get_connection() as conn:
+            cards = self._get_due_cards(conn, set_id, due_by, limit)
+            due_today = conn.execute(
+                f"SELECT COUNT(*) AS due FROM flashcards WHERE {set_filter}due_at < ?", (*set_params, end_of_day)
+            ).fetchone()["due"]
+            next_due_at = conn.execute(
+                f"SELECT MIN(due_at) AS next_due FROM flashcards WHERE {set_filter}due_at > ?", (*set_params, due_by)
+            ).fetchone()["next_due"]
+        return {"cards": cards, "due_today": due_today, "next_due_at": next_due_at}
+
+    def create_session(self, set_id: str, study_mode: str) -> Optional[Dict[str, Any]]:
+        """Start a study session for a set, returning it with the cards to study or None if the set does not exist"""
+        session_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        with get_connection() as conn:
+            if conn.execute("SELECT 1 FROM flashcard_sets WHERE id = ?", (set_id,)).fetchone() is None:
+                return None
+            conn.execute(
+                "INSERT INTO study_sessions (id, set_id, study_mode, started_at) VALUES (?, ?, ?, ?)",
+                (session_id, set_id, study_mode, now)
+            )
+            row = conn.execute("SELECT * FROM study_sessions WHERE id = ?", (session_id,)).fetchone()
+            if study_mode == "Due Cards":
+                cards = self._get_due_cards(conn, set_id, now, DUE_CARDS_MAX_BATCH_SIZE)
+            else:
+                cards = self._get_cards(conn, set_id)
+            return {**self._session(row), "cards": cards}
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a study session, or None if it does not exist"""
+        with get_connection() as conn:
+            row = conn.execute("SELECT * FROM study_sessions WHERE id = ?", (session_id,)).fetchone()
+        return self._session(row) if row else None
+
+    def record_answer(self, session_id: str, answer: Optional[str], is_correct: bool,
+                      card_id: Optional[int] = None, quality: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Record an answer, advance the session's counters and reschedule the card in one transaction
+
+        Returns the updated session (with the card's new schedule under "card" when card_id is
+        given), or None if the session does not exist. Raises CardNotFoundError if the card is
+        not part of the session's set.
+        """
+        if quality is None:
+            quality = quality_from_correctness(is_correct)
+        answered_at = datetime.now()
+        with get_connection() as conn:
+            # The counters are updated in SQL so concurrent answers never overwrite each other
+            cursor = conn.execute(
+                "UPDATE study_sessions SET current_card = current_card + 1, "
+                "correct_answers = correct_answers + ?, total_answered = total_answered + 1 WHERE id = ?",
+                (int(bool(is_correct)), session_id)
+            )
+            if cursor.rowcount == 0:
+                return None
+            conn.execute(
+                "INSERT INTO study_answers (session_id, card_id, answer, is_correct, quality, answered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, card_id, answer, int(bool(is_correct)), quality, answered_at.isoformat())
+            )
+            row = conn.execute("SELECT * FROM study_sessions WHERE id = ?", (session_id,)).fetchone()
+            session = self._session(row)
+
+            if card_id is not None:
+                card = conn.execute(
+                    f"SELECT {CARD_COLUMNS} FROM flashcards WHERE id = ? AND set_id = ?", (card_id, session["set_id"])
+                ).fetchone()
+                if card is None:
+                    raise CardNotFoundError(f"Card {card_id} is not part of flashcard set {session['set_id']}")
+                schedule = review(CardSchedule(card["ease"], card["interval_days"], card["repetitions"]), quality)
+                due_at = (answered_at + timedelta(days=schedule.interval_days)).isoformat()
+                conn.execute(
+                    "UPDATE flashcards SET ease = ?, interval_days = ?, repetitions = ?, due_at = ? WHERE id = ?",
+                    (*schedule, due_at, card_id)
+                )
+                session["card"] = {**self._card(card), **schedule._asdict(), "due_at": due_at}
+        return session
+
+# Global flashcard store instance
+flashcard_store = FlashcardStore()
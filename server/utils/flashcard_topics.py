@@ -0,0 +1,59 @@
+from typing import List, Optional
+
+from .db import get_connection
+
+# Seed queries used to retrieve diverse content for flashcard generation when no topics are configured
+DEFAULT_FLASHCARD_TOPICS = [
+    "KTP platform features",
+    "vector database concepts",
+    "semantic search technology",
+    "data integration process",
+    "knowledge management system",
+    "AI Q&A system",
+    "learning path features",
+    "flashcard generation",
+    "GitHub integration",
+    "Notion integration",
+    "Slack integration",
+    "deduplication system",
+    "embeddings technology",
+    "RAG system architecture",
+    "Pinecone database",
+    "OpenAI integration",
+    "Flask backend",
+    "Streamlit frontend"
+]
+
+class FlashcardTopics:
+    """Configured flashcard seed topics, stored in SQLite so changes apply to every worker without a restart"""
+
+    def __init__(self):
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Create the topics table if it does not exist"""
+        with get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS flashcard_topics (
+                    position INTEGER PRIMARY KEY,
+                    topic TEXT NOT NULL
+                )
+            """)
+
+    def get(self) -> List[str]:
+        """Get the configured topics in order, or the defaults if none are configured"""
+        with get_connection() as conn:
+            rows = conn.execute("SELECT topic FROM flashcard_topics ORDER BY position").fetchall()
+        return [row["topic"] for row in rows] or list(DEFAULT_FLASHCARD_TOPICS)
+
+    def set(self, topics: Optional[List[str]]):
+        """Replace the configured topics; an empty list or None restores the defaults"""
+        with get_connection() as conn:
+            conn.execute("DELETE FROM flashcard_topics")
+            conn.executemany(
+                "INSERT INTO flashcard_topics (position, topic) VALUES (?, ?)",
+                list(enumerate(topics or []))
+            )
+
+# Global flashcard topics instance
+flashcard_topics = FlashcardTopics()
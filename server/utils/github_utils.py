@@ -1,4 +1,5 @@
 import os
+import re
 import requests
 import base64
 from typing import List, Dict, Any
@@ -175,18 +176,22 @@ class GitHubIntegration:
             print(f"Error searching repositories: {e}")
             return []
 
+# Markdown cleanup patterns, applied in order by extract_text_from_markdown
+MARKDOWN_PATTERNS = [
+    (re.compile(r'#+\s*'), ''),  # Headers
+    (re.compile(r'\*\*(.*?)\*\*'), r'\1'),  # Bold
+    (re.compile(r'\*(.*?)\*'), r'\1'),  # Italic
+    (re.compile(r'`(.*?)`'), r'\1'),  # Inline code
+    (re.compile(r'```.*?```', flags=re.DOTALL), ''),  # Code blocks
+    (re.compile(r'\[([^\]]+)\]\([^)]+\)'), r'\1'),  # Links
+    (re.compile(r'!\[([^\]]*)\]\([^)]+\)'), ''),  # Images
+]
+
 def extract_text_from_markdown(content: str) -> str:
     """Extract plain text from markdown content"""
-    import re
-    
     # Remove markdown syntax
-    content = re.sub(r'#+\s*', '', content)  # Headers
-    content = re.sub(r'\*\*(.*?)\*\*', r'\1', content)  # Bold
-    content = re.sub(r'\*(.*?)\*', r'\1', content)  # Italic
-    content = re.sub(r'`(.*?)`', r'\1', content)  # Inline code
-    content = re.sub(r'```.*?```', '', content, flags=re.DOTALL)  # Code blocks
-    content = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', content)  # Links
-    content = re.sub(r'!\[([^\]]*)\]\([^)]+\)', '', content)  # Images
+    for pattern, replacement in MARKDOWN_PATTERNS:
+        content = pattern.sub(replacement, content)
     
     return content.strip()
 
@@ -208,7 +213,8 @@ def get_github_data(owner: str, repo: str) -> List[Dict[str, Any]]:
         if readme_content:
             data.append({
                 "title": f"{owner}/{repo} - README",
-                "content": extract_text_from_markdown(readme_content),
+                "content": readme_content,
+                "normalizer": "markdown",
                 "source": f"github://{owner}/{repo}/README.md",
                 "type": "documentation"
             })
@@ -229,7 +235,8 @@ def get_github_data(owner: str, repo: str) -> List[Dict[str, Any]]:
                     file_count += 1
                     data.append({
                         "title": f"{owner}/{repo} - {file['name']}",
-                        "content": extract_text_from_markdown(file["content"]),
+                        "content": file["content"],
+                        "normalizer": "markdown",
                         "source": f"github://{owner}/{repo}/{file['path']}",
                         "type": "code" if file["name"].endswith(('.py', '.js', '.ts', '.java', '.cpp', '.c', '.h', '.cs', '.php', '.rb', '.go', '.rs', '.swift')) else "documentation"
                     })
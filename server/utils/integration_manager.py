@@ -14,8 +14,9 @@ from .enhanced_chunker import (
     create_pinecone_vectors,
     generate_content_hash
 )
-from .openai_utils import get_embedding
-from .pinecone_utils import upsert_chunks, query_chunks
+from .parallel_chunker import chunk_documents
+from .llm_provider import get_embedding
+from .pinecone_utils import upsert_source_chunks, prune_sources, query_chunks, namespace_for_integration
 
 load_dotenv()
 
@@ -49,8 +50,10 @@ class IntegrationManager:
             total_chunks = 0
             stored_chunks = 0
             
-            for item in github_data:
-                chunks = chunk_text(item["content"], max_tokens=300, overlap=50)
+            # Normalize and chunk all documents up front (in parallel for large batches)
+            chunked_documents = chunk_documents(github_data, max_tokens=300, overlap=50)
+            
+            for item, chunks in zip(github_data, chunked_documents):
                 
                 vectors = []
                 for chunk in chunks:
@@ -80,9 +83,8 @@ class IntegrationManager:
                 # Check for duplicates before upserting
                 unique_vectors = self._deduplicate_vectors(vectors)
                 
-                # Only upsert if there are vectors to upsert
-                if unique_vectors:
-                    upsert_chunks(unique_vectors)
+                # Upsert over the source's existing IDs and drop its stale chunks
+                upsert_source_chunks(item["source"], unique_vectors, "github")
                 
                 total_chunks += len(chunks)
                 stored_chunks += len(unique_vectors)
@@ -131,8 +133,10 @@ class IntegrationManager:
             total_chunks = 0
             stored_chunks = 0
             
-            for item in notion_data:
-                chunks = chunk_text(item["content"], max_tokens=300, overlap=50)
+            # Normalize and chunk all documents up front (in parallel for large batches)
+            chunked_documents = chunk_documents(notion_data, max_tokens=300, overlap=50)
+            
+            for item, chunks in zip(notion_data, chunked_documents):
                 
                 vectors = []
                 for chunk in chunks:
@@ -162,9 +166,8 @@ class IntegrationManager:
                 # Check for duplicates before upserting
                 unique_vectors = self._deduplicate_vectors(vectors)
                 
-                # Only upsert if there are vectors to upsert
-                if unique_vectors:
-                    upsert_chunks(unique_vectors)
+                # Upsert over the source's existing IDs and drop its stale chunks
+                upsert_source_chunks(item["source"], unique_vectors, "notion")
                 
                 total_chunks += len(chunks)
                 stored_chunks += len(unique_vectors)
@@ -212,8 +215,10 @@ class IntegrationManager:
             total_chunks = 0
             stored_chunks = 0
             
-            for item in slack_data:
-                chunks = chunk_text(item["content"], max_tokens=300, overlap=50)
+            # Normalize and chunk all documents up front (in parallel for large batches)
+            chunked_documents = chunk_documents(slack_data, max_tokens=300, overlap=50)
+            
+            for item, chunks in zip(slack_data, chunked_documents):
                 
                 vectors = []
                 for chunk in chunks:
@@ -235,7 +240,9 @@ class IntegrationManager:
                             "start_pos": chunk["start_pos"],
                             "end_pos": chunk["end_pos"],
                             "integration_timestamp": datetime.datetime.now().isoformat(),
-                            "timestamp": item.get("timestamp", datetime.datetime.now().isoformat())
+                            "timestamp": item.get("timestamp", datetime.datetime.now().isoformat()),
+                            # Conversation window details (speakers, ts range, message count)
+                            **item.get("metadata", {})
                         }
                     }
                     vectors.append(vector_data)
@@ -243,20 +250,27 @@ class IntegrationManager:
                 # Check for duplicates before upserting
                 unique_vectors = self._deduplicate_vectors(vectors)
                 
-                # Only upsert if there are vectors to upsert
-                if unique_vectors:
-                    upsert_chunks(unique_vectors)
+                # Upsert over the source's existing IDs and drop its stale chunks
+                upsert_source_chunks(item["source"], unique_vectors, "slack")
                 
                 total_chunks += len(chunks)
                 stored_chunks += len(unique_vectors)
             
+            # Windows synced earlier under a channel or DM that this run no longer produced are stale
+            produced_sources = {item["source"] for item in slack_data}
+            stale_sources = []
+            for sync_prefix in sorted({item["sync_prefix"] for item in slack_data if item.get("sync_prefix")}):
+                stale_sources.extend(prune_sources(sync_prefix + "/", produced_sources, namespace_for_integration("slack")))
+            
             return {
                 "success": True,
                 "source": "slack://workspace",
-                "messages_processed": len(slack_data),
+                "messages_processed": sum(item.get("metadata", {}).get("message_count", 1) for item in slack_data),
+                "windows_processed": len(slack_data),
                 "chunks_processed": total_chunks,
                 "chunks_stored": stored_chunks,
                 "duplicates_removed": total_chunks - stored_chunks,
+                "stale_sources_removed": len(stale_sources),
                 "integration": "slack"
             }
             
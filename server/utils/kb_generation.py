@@ -0,0 +1,39 @@
+from .db import get_connection
+
+class KnowledgeBaseGeneration:
+    """Knowledge-base generation counter shared by all worker processes through SQLite
+
+    Every write to the index bumps the counter, so result caches of every process
+    (keyed by the generation they were computed for) stop serving stale entries.
+    """
+
+    def __init__(self):
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Create the single-row generation table if it does not exist"""
+        with get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS kb_generation (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    generation INTEGER NOT NULL
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO kb_generation (id, generation) VALUES (0, 0)")
+
+    def get(self) -> int:
+        """Current generation"""
+        with get_connection() as conn:
+            row = conn.execute("SELECT generation FROM kb_generation WHERE id = 0").fetchone()
+        return row["generation"]
+
+    def bump(self) -> int:
+        """Advance the generation, returning the new value"""
+        with get_connection() as conn:
+            # The update takes the write lock, so the read that follows sees this bump
+            conn.execute("UPDATE kb_generation SET generation = generation + 1 WHERE id = 0")
+            row = conn.execute("SELECT generation FROM kb_generation WHERE id = 0").fetchone()
+        return row["generation"]
+
+# Global knowledge-base generation instance
+kb_generation = KnowledgeBaseGeneration()
@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Optional
+import numpy as np
+from dotenv import load_dotenv
+
+# The provider interface lives in its own module so provider implementations can be imported in any order
+from .provider_base import LLMProvider, EMBEDDING_DIMENSION, DEFAULT_EMBEDDING_ID
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Provider used for chat completions ("openai" or "fake") and for embeddings ("openai", "fake" or "local")
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", LLM_PROVIDER)
+
+# Fake provider behaviour: injected latency per call and fraction of calls that fail
+FAKE_EMBEDDING_LATENCY_MS = float(os.getenv("FAKE_EMBEDDING_LATENCY_MS", 0))
+FAKE_CHAT_LATENCY_MS = float(os.getenv("FAKE_CHAT_LATENCY_MS", 0))
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", 0))
+FAKE_SEED = int(os.getenv("FAKE_SEED", 0))
+
+class InjectedProviderError(Exception):
+    """Failure injected by the fake provider"""
+
+class FakeProvider(LLMProvider):
+    """Deterministic local stand-in for load tests and benchmarks (no network, no cost)"""
+
+    name = "fake"
+    embedding_id = "fake"
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, embedding_latency_ms: float = FAKE_EMBEDDING_LATENCY_MS,
+                 chat_latency_ms: float = FAKE_CHAT_LATENCY_MS, error_rate: float = FAKE_ERROR_RATE,
+                 seed: int = FAKE_SEED):
+        self.dimension = dimension
+        self.embedding_latency_ms = embedding_latency_ms
+        self.chat_latency_ms = chat_latency_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _simulate_call(self, latency_ms: float):
+        """Sleep for the configured latency and fail at the configured rate"""
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000)
+        if self.error_rate > 0:
+            with self._lock:
+                failed = self._random.random() < self.error_rate
+                rate_limited = self._random.random() < 0.5
+            if failed:
+                # Mirror the messages the routes already map to 429/503 responses
+                if rate_limited:
+                    raise InjectedProviderError("Injected provider error: rate limit exceeded (too many requests)")
+                raise InjectedProviderError("Injected provider error: 500 internal server error")
+
+    def _embed_one(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], "big")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self._simulate_call(self.embedding_latency_ms)
+        return [self._embed_one(text) for text in texts]
+
+    def chat(self, messages: List[Dict[str, str]], max_tokens: int = 500,
+             temperature: float = 0.7, model: Optional[str] = None) -> str:
+        self._simulate_call(self.chat_latency_ms)
+        prompt = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        # Echo the start of the supplied context/content so answers stay tied to the prompt
+        excerpt = " ".join(re.split(r'(?:Context|Content):', prompt, maxsplit=1)[-1].split()[:40])
+
+        # Batched flashcard prompts get one card per numbered snippet
+        if "json array" in prompt.lower():
+            parts = re.split(r'^Snippet (\d+)\b[^\n]*\n', prompt, flags=re.MULTILINE)
+            return json.dumps([
+                {
+                    "snippet": int(number),
+                    "question": f"What does passage {digest}-{number} describe?",
+                    "answer": " ".join(text.split()[:40])
+                }
+                for number, text in zip(parts[1::2], parts[2::2])
+            ])
+
+        # Callers that ask for JSON (flashcards) get a parseable flashcard
+        if any("json" in message["content"].lower() for message in messages):
+            return json.dumps({
+                "question": f"What does passage {digest} describe?",
+                "answer": excerpt
+            })
+        return f"[fake answer {digest}] {excerpt}"[:max_tokens * 4]
+
+    def health_check(self):
+        self._simulate_call(0)
+
+def create_provider(name: str) -> LLMProvider:
+    """Create the provider registered under name"""
+    if name == "fake":
+        return FakeProvider()
+    if name == "openai":
+        # Imported lazily so the other providers work without the openai package
+        from .openai_utils import OpenAIProvider
+        return OpenAIProvider()
+    if name == "local":
+        from .local_embeddings import LocalEmbeddingProvider
+        return LocalEmbeddingProvider()
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+def embedding_namespace_tag() -> str:
+    """Namespace suffix of the current embedding space (the default OpenAI model keeps the original, untagged namespaces)"""
+    embedding_id = embedding_provider.embedding_id
+    return "" if embedding_id == DEFAULT_EMBEDDING_ID else f"@{embedding_id}"
+
+def get_embedding(text: str) -> List[float]:
+    """Embed one text with the configured embedding provider"""
+    return embedding_provider.embed([text])[0]
+
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embed a batch of texts in one request, preserving input order"""
+    if not texts:
+        return []
+    return embedding_provider.embed(texts)
+
+def chat_completion(messages: List[Dict[str, str]], max_tokens: int = 500,
+                    temperature: float = 0.7, model: Optional[str] = None) -> str:
+    """Complete a chat conversation with the configured provider"""
+    return llm_provider.chat(messages, max_tokens=max_tokens, temperature=temperature, model=model)
+
+def create_chat_provider(name: str) -> LLMProvider:
+    """Create the provider registered under name, rejecting providers that cannot serve chat"""
+    provider = create_provider(name)
+    if not provider.supports_chat:
+        raise ValueError(
+            f"LLM_PROVIDER={name} only computes embeddings; set LLM_PROVIDER to \"openai\" or \"fake\" "
+            f"and EMBEDDING_PROVIDER={name}"
+        )
+    return provider
+
+# Global provider instances
+llm_provider = create_chat_provider(LLM_PROVIDER)
+embedding_provider = llm_provider if EMBEDDING_PROVIDER == LLM_PROVIDER else create_provider(EMBEDDING_PROVIDER)
+logger.info(f"Using LLM provider: {llm_provider.name}, embeddings: {embedding_provider.embedding_id}")
@@ -0,0 +1,130 @@
+import threading
+import numpy as np
+from typing import List
+
+from .provider_base import LLMProvider, EMBEDDING_DIMENSION
+
+# Documents embedded per vectorized pass (bounds the dense accumulator size)
+LOCAL_EMBEDDING_BATCH_SIZE = 1024
+
+# Bytes that are not ASCII letters/digits become spaces; UTF-8 multibyte sequences stay part of words
+_NORMALIZE_TABLE = np.full(256, ord(" "), dtype=np.uint8)
+for _byte in b"abcdefghijklmnopqrstuvwxyz0123456789":
+    _NORMALIZE_TABLE[_byte] = _byte
+_NORMALIZE_TABLE[128:] = np.arange(128, 256, dtype=np.uint8)
+
+# Dimension set to 1 in the vector of a text that has no words
+EMPTY_TEXT_BUCKET = 0
+
+# Polynomial rolling hash base (odd, so it is invertible modulo 2**32) and bigram combiner
+_HASH_BASE = 0x01000193
+_HASH_BASE_INVERSE = pow(_HASH_BASE, -1, 2 ** 32)
+_BIGRAM_MULTIPLIER = np.uint32(0x9E3779B1)
+
+_powers_lock = threading.Lock()
+_powers = np.ones(1, dtype=np.uint32)
+_inverse_powers = np.ones(1, dtype=np.uint32)
+
+def _hash_powers(length: int):
+    """Powers of the hash base and its inverse modulo 2**32, grown on demand and reused"""
+    global _powers, _inverse_powers
+    powers, inverse_powers = _powers, _inverse_powers
+    if len(powers) <= length:
+        with _powers_lock:
+            size = max(length + 1, 2 * len(_powers))
+            powers = np.empty(size, dtype=np.uint32)
+            inverse_powers = np.empty(size, dtype=np.uint32)
+            powers[0] = inverse_powers[0] = 1
+            powers[1:] = _HASH_BASE
+            inverse_powers[1:] = _HASH_BASE_INVERSE
+            # uint32 products wrap around, which is exactly arithmetic modulo 2**32
+            np.cumprod(powers, out=powers)
+            np.cumprod(inverse_powers, out=inverse_powers)
+            _powers, _inverse_powers = powers, inverse_powers
+    return powers, inverse_powers
+
+def _mix(hashes: np.ndarray) -> np.ndarray:
+    """Avalanche step so the bucket and sign bits of a feature hash are independent"""
+    hashes = hashes ^ (hashes >> np.uint32(16))
+    hashes *= np.uint32(0x45D9F3B)
+    hashes ^= hashes >> np.uint32(16)
+    hashes *= np.uint32(0x45D9F3B)
+    return hashes ^ (hashes >> np.uint32(16))
+
+class LocalEmbeddingProvider(LLMProvider):
+    """CPU-only embeddings from hashed word unigrams and bigrams, for offline and cost-free ingestion
+
+    Every feature is hashed to one dimension with a random sign, which is a fixed
+    sparse random projection of the hashed term-frequency space. Counts are damped
+    with a signed square root and vectors are L2-normalized. No corpus statistics
+    (IDF) are kept, so the same text gets the same vector in every process.
+    """
+
+    name = "local"
+    embedding_id = "local-hash-v1"
+    supports_chat = False
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION):
+        self.dimension = dimension
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        # Documents are joined with a space; their byte lengths give the boundaries
+        joined = " ".join(texts) + " "
+        if joined.isascii():
+            raw = joined.lower().encode('ascii')
+            lengths = np.fromiter((len(text) + 1 for text in texts), dtype=np.int64, count=len(texts))
+        else:
+            encoded = [text.lower().encode('utf-8') for text in texts]
+            raw = b" ".join(encoded) + b" "
+            lengths = np.fromiter((len(data) + 1 for data in encoded), dtype=np.int64, count=len(encoded))
+        data = _NORMALIZE_TABLE[np.frombuffer(raw, dtype=np.uint8)]
+
+        # Word boundaries from transitions between space and non-space bytes
+        is_word = np.zeros(len(data) + 2, dtype=np.int8)
+        np.greater(data, ord(" "), out=is_word[1:-1])
+        edges = np.diff(is_word)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        # Word hash = (prefix[end] - prefix[start]) / base**start, all modulo 2**32
+        powers, inverse_powers = _hash_powers(len(data))
+        prefix = np.zeros(len(data) + 1, dtype=np.uint32)
+        np.cumsum(data.astype(np.uint32) * powers[:len(data)], out=prefix[1:])
+        words = (prefix[ends] - prefix[starts]) * inverse_powers[starts]
+
+        # Bigrams of consecutive words within the same document
+        docs = np.searchsorted(np.cumsum(lengths), starts, side="right")
+        same_doc = docs[1:] == docs[:-1]
+        bigrams = ((words[:-1] * _BIGRAM_MULTIPLIER) ^ words[1:])[same_doc]
+        features = _mix(np.concatenate([words, bigrams]))
+        feature_docs = np.concatenate([docs, docs[:-1][same_doc]])
+
+        # Bucket by multiply-shift of the low 16 bits, sign from the top bit
+        buckets = (((features & np.uint32(0xFFFF)) * np.uint32(self.dimension)) >> np.uint32(16)).astype(np.int64)
+        signs = np.where(features >> np.uint32(31), np.float32(-1), np.float32(1))
+        vectors = np.zeros(len(texts) * self.dimension, dtype=np.float32)
+        np.add.at(vectors, feature_docs * self.dimension + buckets, signs)
+
+        vectors = vectors.reshape(len(texts), self.dimension)
+        magnitudes = np.sqrt(np.abs(vectors))
+        np.copysign(magnitudes, vectors, out=vectors)
+        norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+        vectors /= np.maximum(norms, 1e-12)[:, None]
+        # Texts without any word (empty, punctuation only) get a fixed unit vector; the index rejects all-zero vectors
+        vectors[norms == 0, EMPTY_TEXT_BUCKET] = 1
+        return vectors
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), dimension) float32 array"""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.vstack([
+            self._embed_batch(texts[start:start + LOCAL_EMBEDDING_BATCH_SIZE])
+            for start in range(0, len(texts), LOCAL_EMBEDDING_BATCH_SIZE)
+        ])
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def health_check(self):
+        pass
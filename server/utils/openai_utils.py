@@ -2,12 +2,38 @@ from openai import OpenAI
 import os
 from dotenv import load_dotenv
 
+from .provider_base import LLMProvider
+
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def get_embedding(text):
-    res = client.embeddings.create(
-        input=text,
-        model="text-embedding-3-small"
-    )
-    return res.data[0].embedding
+
+# Models used for embeddings and chat completions
+EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-3.5-turbo")
+
+class OpenAIProvider(LLMProvider):
+    """Embeddings and chat completions from the OpenAI API"""
+
+    name = "openai"
+    embedding_id = f"openai/{EMBEDDING_MODEL}"
+
+    def __init__(self, api_key=None):
+        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+
+    def embed(self, texts):
+        res = self.client.embeddings.create(
+            input=texts,
+            model=EMBEDDING_MODEL
+        )
+        return [item.embedding for item in sorted(res.data, key=lambda item: item.index)]
+
+    def chat(self, messages, max_tokens=500, temperature=0.7, model=None):
+        response = self.client.chat.completions.create(
+            model=model or CHAT_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+    def health_check(self):
+        self.client.models.list()
@@ -0,0 +1,81 @@
+import os
+import logging
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Tuple
+from dotenv import load_dotenv
+
+from .enhanced_chunker import chunk_text
+from .github_utils import extract_text_from_markdown
+from .process_pool import get_process_pool, discard_process_pool
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Chunking tasks run concurrently in the shared process pool (1 disables the pool)
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", os.cpu_count() or 1))
+
+# Below this many documents, or this many characters in total, chunking stays in-process
+CHUNK_PARALLEL_MIN_DOCS = int(os.getenv("CHUNK_PARALLEL_MIN_DOCS", 50))
+CHUNK_PARALLEL_MIN_CHARS = int(os.getenv("CHUNK_PARALLEL_MIN_CHARS", 500000))
+
+# Text normalizers a document can request through its "normalizer" key
+NORMALIZERS = {
+    "markdown": extract_text_from_markdown
+}
+
+# Field order of the compact chunk records returned by worker processes
+CHUNK_RECORD_FIELDS = (
+    "id", "text", "content_hash", "start_pos", "end_pos",
+    "sentence_count", "word_count", "chunk_index"
+)
+
+def _chunk_document(task: Tuple[str, str, str, int, int]) -> List[tuple]:
+    """Normalize and chunk one document, returning compact chunk records"""
+    source, content, normalizer, max_tokens, overlap = task
+    if normalizer:
+        content = NORMALIZERS[normalizer](content)
+    chunks = chunk_text(content, max_tokens=max_tokens, overlap=overlap, source=source)
+    return [tuple(chunk[field] for field in CHUNK_RECORD_FIELDS) for chunk in chunks]
+
+def chunk_documents(items: List[Dict[str, Any]], max_tokens: int = 300, overlap: int = 50,
+                    max_workers: int = None) -> List[List[Dict[str, Any]]]:
+    """
+    Normalize and chunk documents, in the shared process pool for large batches
+
+    Args:
+        items: Documents with "source", "content" and an optional "normalizer"
+        max_tokens: Maximum tokens per chunk
+        overlap: Overlap between chunks in characters
+        max_workers: Tasks run concurrently (defaults to CHUNK_WORKERS)
+
+    Returns:
+        One list of chunk dictionaries per input document, in input order
+    """
+    tasks = [
+        (item.get("source", ""), item.get("content") or "", item.get("normalizer"), max_tokens, overlap)
+        for item in items
+    ]
+    workers = min(max_workers or CHUNK_WORKERS, len(tasks))
+
+    records = None
+    total_chars = sum(len(task[1]) for task in tasks)
+    if workers > 1 and len(tasks) >= CHUNK_PARALLEL_MIN_DOCS and total_chars >= CHUNK_PARALLEL_MIN_CHARS:
+        executor = get_process_pool()
+        try:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            records = list(executor.map(_chunk_document, tasks, chunksize=chunksize))
+            logger.info(f"Chunked {len(tasks)} documents in the process pool")
+        except BrokenProcessPool as e:
+            discard_process_pool(executor)
+            logger.warning(f"Process pool broke, chunking in-process: {str(e)}")
+        except Exception as e:
+            logger.warning(f"Parallel chunking failed, falling back to in-process: {str(e)}")
+
+    if records is None:
+        records = [_chunk_document(task) for task in tasks]
+
+    return [
+        [dict(zip(CHUNK_RECORD_FIELDS, record)) for record in document_records]
+        for document_records in records
+    ]
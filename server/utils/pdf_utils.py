@@ -0,0 +1,113 @@
+import io
+import os
+import tempfile
+import logging
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Tuple, Union
+from dotenv import load_dotenv
+
+# Optional PDF support
+try:
+    import PyPDF2
+    PDF_SUPPORT = True
+except ImportError:
+    PDF_SUPPORT = False
+
+from .process_pool import get_process_pool, discard_process_pool
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Page ranges extracted concurrently per document in the shared process pool (1 disables the pool)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1))
+
+# Pages extracted per pool task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 16))
+
+# Below this many pages extraction stays in-process
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 64))
+
+# Last (path, reader) opened in a worker process, reused by the following tasks of the same document
+_worker_reader = None
+
+def _open_reader(pdf_source: Union[bytes, str]):
+    """Open a PdfReader from raw bytes or a file path"""
+    if isinstance(pdf_source, bytes):
+        return PyPDF2.PdfReader(io.BytesIO(pdf_source))
+    return PyPDF2.PdfReader(pdf_source)
+
+def _extract_page_range(task: Tuple[str, int, int]) -> List[str]:
+    """Extract the text of pages [start, end) of the PDF at path in a worker process"""
+    global _worker_reader
+    path, start, end = task
+    if _worker_reader is None or _worker_reader[0] != path:
+        _worker_reader = (path, _open_reader(path))
+    reader = _worker_reader[1]
+    return [(reader.pages[i].extract_text() or "") + "\n" for i in range(start, end)]
+
+def iter_pdf_pages(pdf_source: Union[bytes, str], max_workers: int = None) -> Iterator[str]:
+    """
+    Yield the text of each PDF page in order
+    
+    Large documents are split into page ranges that are extracted by the
+    shared process pool. At most two ranges per worker are in flight, so
+    memory stays bounded by the page window rather than the document size.
+    
+    Args:
+        pdf_source: PDF content as bytes, or a path to the PDF file
+        max_workers: Page ranges extracted concurrently (defaults to PDF_WORKERS)
+    
+    Returns:
+        Iterator of page texts, each terminated by a newline
+    """
+    if not PDF_SUPPORT:
+        raise Exception("PDF support not available. Install PyPDF2: pip install PyPDF2")
+    
+    try:
+        reader = _open_reader(pdf_source)
+        page_count = len(reader.pages)
+    except Exception as e:
+        raise Exception(f"Failed to extract text from PDF: {str(e)}")
+    
+    workers = max_workers or PDF_WORKERS
+    if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+        for page in reader.pages:
+            yield (page.extract_text() or "") + "\n"
+        return
+    
+    del reader
+    # Workers open the document by path; raw bytes are spooled to a temporary file first
+    spooled = None
+    if isinstance(pdf_source, bytes):
+        spooled = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        with spooled:
+            spooled.write(pdf_source)
+        pdf_source = spooled.name
+    
+    try:
+        tasks = [
+            (pdf_source, start, min(start + PDF_PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)
+        ]
+        logger.info(f"Extracting {page_count} PDF pages in the process pool")
+        
+        executor = get_process_pool()
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(executor.submit(_extract_page_range, task))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        except BrokenProcessPool as e:
+            discard_process_pool(executor)
+            raise Exception(f"Failed to extract text from PDF: {str(e)}")
+        finally:
+            for future in pending:
+                future.cancel()
+    finally:
+        if spooled is not None:
+            os.unlink(spooled.name)
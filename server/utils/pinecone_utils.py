@@ -1,8 +1,15 @@
 import os
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from pinecone import Pinecone
 from dotenv import load_dotenv
+from .source_registry import source_registry
+from .kb_generation import kb_generation
+from .document_store import document_store
+from .reranking import mmr_select
+from .llm_provider import embedding_provider, embedding_namespace_tag
 
 load_dotenv()
 
@@ -17,11 +24,101 @@ pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
 index_name = os.getenv("PINECONE_INDEX_NAME")
 index = pc.Index(index_name)
 
+# Candidates over-fetched per requested result when MMR reranking is enabled
+MMR_FETCH_MULTIPLIER = int(os.getenv("MMR_FETCH_MULTIPLIER", 4))
+
+# Vectors are namespaced per integration, optionally prefixed by a tenant
+PINECONE_TENANT = os.getenv("PINECONE_TENANT", "")
+UPLOADS_NAMESPACE = "uploads"
+
+# Metadata kept in Pinecone for filtering; text and everything else lives in the document store
+PINECONE_METADATA_FIELDS = ("source", "type", "integration", "source_name", "title", "chunk_index", "timestamp",
+                            "embedding_provider")
+
+# Parallel fan-out of queries across namespaces
+QUERY_FANOUT_WORKERS = int(os.getenv("QUERY_FANOUT_WORKERS", 8))
+_query_executor = ThreadPoolExecutor(max_workers=QUERY_FANOUT_WORKERS)
+
+# Namespaces seen in index stats or written by this process
+_known_namespaces = set()
+_namespaces_refreshed_at = 0.0
+_namespaces_generation = None
+
+def get_kb_generation():
+    """Current knowledge-base generation, shared by all worker processes"""
+    return kb_generation.get()
+
+def bump_kb_generation():
+    """Advance the knowledge-base generation after the index changed, invalidating caches in every process"""
+    return kb_generation.bump()
+
+def namespace_for_integration(integration):
+    """Namespace that holds the vectors of an integration (prefixed by PINECONE_TENANT if set)
+    
+    Namespaces are suffixed with the embedding space of every model but the default
+    OpenAI one, so vectors from different embedding models never share a namespace.
+    """
+    integration = integration or UPLOADS_NAMESPACE
+    namespace = f"{PINECONE_TENANT}-{integration}" if PINECONE_TENANT else integration
+    return namespace + embedding_namespace_tag()
+
+def namespaces_for_integrations(integrations):
+    """Namespaces to query for a list of integrations (None means all namespaces)"""
+    return [namespace_for_integration(i) for i in integrations] if integrations else None
+
+def namespace_for(metadata):
+    """Namespace a vector is routed to, based on its integration metadata"""
+    return namespace_for_integration(metadata.get("integration"))
+
+def split_metadata(metadata):
+    """Split vector metadata into Pinecone filter fields, chunk text and document-store metadata"""
+    filterable = {key: value for key, value in metadata.items() if key in PINECONE_METADATA_FIELDS}
+    document = {key: value for key, value in metadata.items() if key not in PINECONE_METADATA_FIELDS and key != "text"}
+    return filterable, metadata.get("text", ""), document
+
+def hydrate_matches(namespaced_matches):
+    """Merge document-store text and metadata into (namespace, match) pairs with one lookup per namespace"""
+    ids_by_namespace = {}
+    for namespace, match in namespaced_matches:
+        ids_by_namespace.setdefault(namespace, []).append(match.id)
+    documents = {namespace: document_store.get_many(namespace, ids) for namespace, ids in ids_by_namespace.items()}
+    # Vectors stored before the document store existed still carry their text in Pinecone
+    return [
+        SimpleNamespace(
+            id=match.id,
+            score=match.score,
+            values=getattr(match, "values", None),
+            metadata={**(match.metadata or {}), **documents[namespace].get(match.id, {})},
+            namespace=namespace
+        )
+        for namespace, match in namespaced_matches
+    ]
+
 def upsert_chunks(vectors, max_retries=3, retry_delay=1):
-    """Upsert chunks with retry logic"""
+    """Upsert chunks with retry logic, routing each vector to its integration namespace
+    
+    Chunk text and descriptive metadata go to the local document store;
+    Pinecone only receives the PINECONE_METADATA_FIELDS used for filtering.
+    """
+    by_namespace = {}
+    documents = {}
+    for vector in vectors:
+        metadata = {**vector.get("metadata", {}), "embedding_provider": embedding_provider.embedding_id}
+        namespace = namespace_for(metadata)
+        filterable, text, document = split_metadata(metadata)
+        by_namespace.setdefault(namespace, []).append({**vector, "metadata": filterable})
+        documents.setdefault(namespace, []).append((vector["id"], text, document))
+    
+    # Documents are written first so a vector is never visible without its text
+    for namespace, namespace_documents in documents.items():
+        document_store.put_many(namespace, namespace_documents)
+    
     for attempt in range(max_retries):
         try:
-            index.upsert(vectors=vectors)
+            for namespace, namespace_vectors in by_namespace.items():
+                index.upsert(vectors=namespace_vectors, namespace=namespace)
+            _known_namespaces.update(by_namespace)
+            bump_kb_generation()
             logger.info(f"Successfully upserted {len(vectors)} vectors")
             return True
         except Exception as e:
@@ -32,8 +129,86 @@ def upsert_chunks(vectors, max_retries=3, retry_delay=1):
                 logger.error(f"All upsert attempts failed: {str(e)}")
                 raise e
 
-def query_chunks(vector, top_k=5, metadata_filter=None, max_retries=3, retry_delay=1):
-    """Query chunks with retry logic and rate limiting"""
+def delete_vectors(ids, namespace, batch_size=1000):
+    """Delete vectors by ID from a namespace in batches"""
+    for start in range(0, len(ids), batch_size):
+        index.delete(ids=ids[start:start + batch_size], namespace=namespace)
+    document_store.delete_many(namespace, ids)
+    if ids:
+        bump_kb_generation()
+        logger.info(f"Deleted {len(ids)} vectors from namespace '{namespace}'")
+
+def prune_source(source, vector_ids, namespace):
+    """Delete vectors previously stored for a source that are not in vector_ids"""
+    orphans = source_registry.get_orphans(source, vector_ids, namespace)
+    for orphan_namespace, orphan_ids in orphans.items():
+        delete_vectors(orphan_ids, orphan_namespace)
+    source_registry.replace_source(source, vector_ids, namespace)
+    return orphans
+
+def prune_sources(prefix, keep_sources, namespace):
+    """Delete every source registered in namespace under prefix that is not in keep_sources, returning the removed sources"""
+    keep_sources = set(keep_sources)
+    removed = [source for source in source_registry.get_sources(prefix, namespace) if source not in keep_sources]
+    for source in removed:
+        prune_source(source, [], namespace)
+    if removed:
+        logger.info(f"Pruned {len(removed)} sources under '{prefix}' in namespace '{namespace}' that are no longer produced")
+    return removed
+
+def upsert_source_chunks(source, vectors, integration=None):
+    """Replace all vectors of a source in its namespace: upsert over existing IDs and delete orphans"""
+    if vectors:
+        namespace = namespace_for(vectors[0]["metadata"])
+    else:
+        # An empty vector set still has to prune the namespace the source was stored in
+        namespace = namespace_for_integration(integration)
+    if vectors:
+        upsert_chunks(vectors)
+    return prune_source(source, [vector["id"] for vector in vectors], namespace)
+
+def fetch_chunks(ids, namespace, batch_size=100):
+    """Fetch the metadata (hydrated from the document store) of vectors by ID, skipping IDs that do not exist"""
+    chunks = {}
+    for start in range(0, len(ids), batch_size):
+        response = index.fetch(ids=ids[start:start + batch_size], namespace=namespace)
+        for vector_id, vector in response.vectors.items():
+            chunks[vector_id] = vector.metadata or {}
+    documents = document_store.get_many(namespace, list(chunks))
+    return {vector_id: {**metadata, **documents.get(vector_id, {})} for vector_id, metadata in chunks.items()}
+
+def purge_namespace(namespace):
+    """Delete every vector in a namespace and forget its sources"""
+    index.delete(delete_all=True, namespace=namespace)
+    bump_kb_generation()
+    document_store.delete_namespace(namespace)
+    removed = source_registry.remove_namespace(namespace)
+    _known_namespaces.discard(namespace)
+    logger.info(f"Purged namespace '{namespace}' ({removed} registered vectors)")
+    return removed
+
+def list_namespaces(max_age=60):
+    """List the index namespaces of the current embedding space
+    
+    Namespaces are refreshed from index stats once the knowledge-base generation has moved
+    (a write in any worker) or after max_age seconds.
+    """
+    global _namespaces_refreshed_at, _namespaces_generation
+    generation = get_kb_generation()
+    if generation != _namespaces_generation or time.time() - _namespaces_refreshed_at > max_age:
+        stats = get_index_stats()
+        if stats is not None:
+            _known_namespaces.update(stats.get("namespaces", {}) or {})
+            _namespaces_refreshed_at = time.time()
+            _namespaces_generation = generation
+    tag = embedding_namespace_tag()
+    if tag:
+        return sorted(namespace for namespace in _known_namespaces if namespace.endswith(tag))
+    return sorted(namespace for namespace in _known_namespaces if "@" not in namespace)
+
+def _query_namespace(vector, top_k, metadata_filter, include_values, namespace,
+                     max_retries=3, retry_delay=1, include_metadata=True):
+    """Query one namespace with retry logic and rate limiting"""
     for attempt in range(max_retries):
         try:
             # Add a small delay to prevent rate limiting
@@ -43,11 +218,12 @@ def query_chunks(vector, top_k=5, metadata_filter=None, max_retries=3, retry_del
             results = index.query(
                 vector=vector,
                 top_k=top_k,
-                include_metadata=True,
-                filter=metadata_filter
+                include_metadata=include_metadata,
+                include_values=include_values,
+                filter=metadata_filter,
+                namespace=namespace
             )
-            logger.info(f"Successfully queried {len(results.matches)} results")
-            return results
+            return results.matches
             
         except Exception as e:
             error_msg = str(e)
@@ -71,6 +247,82 @@ def query_chunks(vector, top_k=5, metadata_filter=None, max_retries=3, retry_del
                 logger.error(f"All query attempts failed: {error_msg}")
                 raise e
 
+def query_chunks(vector, top_k=5, metadata_filter=None, max_retries=3, retry_delay=1,
+                 mmr=False, mmr_lambda=0.5, fetch_k=None, namespaces=None):
+    """Query chunks across namespaces with retry logic and rate limiting
+    
+    namespaces defaults to every namespace in the index; several namespaces are
+    queried in parallel and their matches merged by score. With mmr=True,
+    fetch_k candidates (default top_k * MMR_FETCH_MULTIPLIER) are retrieved with
+    their vectors and reranked locally for diversity.
+    """
+    if mmr:
+        fetch_k = max(fetch_k or top_k * MMR_FETCH_MULTIPLIER, top_k)
+    candidate_count = fetch_k if mmr else top_k
+    
+    if namespaces is None:
+        namespaces = list_namespaces() or [""]
+    
+    def query_namespace(namespace):
+        matches = _query_namespace(vector, candidate_count, metadata_filter, mmr, namespace,
+                                   max_retries=max_retries, retry_delay=retry_delay)
+        return [(namespace, match) for match in matches]
+    
+    if len(namespaces) == 1:
+        matches = query_namespace(namespaces[0])
+    else:
+        matches = []
+        for namespace_matches in _query_executor.map(query_namespace, namespaces):
+            matches.extend(namespace_matches)
+        matches.sort(key=lambda pair: pair[1].score, reverse=True)
+        matches = matches[:candidate_count]
+    logger.info(f"Successfully queried {len(matches)} results from {len(namespaces)} namespace(s)")
+    
+    if mmr:
+        selected = mmr_select(vector, [match.values for _, match in matches], top_k, mmr_lambda)
+        logger.info(f"MMR selected {len(selected)} of {len(matches)} candidates")
+        matches = [matches[i] for i in selected]
+    
+    # Only the final matches are hydrated with their text
+    return SimpleNamespace(matches=hydrate_matches(matches))
+
+def query_chunk_ids(vector, top_k=100, metadata_filter=None, namespaces=None):
+    """Query the best chunk IDs across namespaces without metadata, as (namespace, id, score) sorted by score"""
+    if namespaces is None:
+        namespaces = list_namespaces() or [""]
+    
+    def query_namespace(namespace):
+        matches = _query_namespace(vector, top_k, metadata_filter, False, namespace, include_metadata=False)
+        return [(namespace, match.id, match.score) for match in matches]
+    
+    candidates = []
+    for namespace_candidates in _query_executor.map(query_namespace, namespaces):
+        candidates.extend(namespace_candidates)
+    candidates.sort(key=lambda candidate: candidate[2], reverse=True)
+    return candidates[:top_k]
+
+def sample_chunk_vectors(probe_vectors, per_probe=50, namespaces=None):
+    """Sample chunk vectors by querying with each probe vector, as unique (namespace, id, values) tuples
+
+    Pinecone cannot list vectors with their values, so the nearest neighbours of a spread
+    of probe directions (e.g. topic embeddings and random vectors) stand in for a sample.
+    """
+    if namespaces is None:
+        namespaces = list_namespaces() or [""]
+
+    def query_probe(task):
+        namespace, vector = task
+        matches = _query_namespace(vector, per_probe, None, True, namespace, include_metadata=False)
+        return [(namespace, match.id, match.values) for match in matches]
+
+    tasks = [(namespace, list(vector)) for namespace in namespaces for vector in probe_vectors]
+    samples = {}
+    for probe_samples in _query_executor.map(query_probe, tasks):
+        for namespace, vector_id, values in probe_samples:
+            if values:
+                samples.setdefault((namespace, vector_id), values)
+    return [(namespace, vector_id, values) for (namespace, vector_id), values in samples.items()]
+
 def check_index_health():
     """Check if the Pinecone index is healthy"""
     try:
@@ -0,0 +1,44 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Worker processes of the shared pool used for CPU-bound ingestion work
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", os.cpu_count() or 1))
+
+# Workers are started from a clean server process rather than forked from the threaded web worker
+PROCESS_POOL_START_METHOD = os.getenv("PROCESS_POOL_START_METHOD", "forkserver")
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the long-lived process pool of this process, creating it on first use"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited from a parent process (e.g. a preloading server) cannot be used
+        if _pool is None or _pool_pid != os.getpid():
+            if PROCESS_POOL_START_METHOD in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context(PROCESS_POOL_START_METHOD)
+            else:
+                context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=max(1, PROCESS_POOL_WORKERS), mp_context=context)
+            _pool_pid = os.getpid()
+            logger.info(f"Started process pool with {PROCESS_POOL_WORKERS} {context.get_start_method()} workers")
+        return _pool
+
+def discard_process_pool(pool: ProcessPoolExecutor):
+    """Drop a pool that broke (e.g. a worker died) so the next call starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
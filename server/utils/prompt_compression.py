@@ -0,0 +1,208 @@
+import os
+import re
+import math
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+from .llm_provider import get_embeddings
+from .context_builder import estimate_tokens
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Fraction of the original tokens kept by compression
+COMPRESSION_RATIO = float(os.getenv("COMPRESSION_RATIO", 0.5))
+
+# Sentence embeddings kept in memory for scoring
+SENTENCE_EMBEDDING_CACHE_SIZE = int(os.getenv("SENTENCE_EMBEDDING_CACHE_SIZE", 5000))
+
+COMPRESSION_METHODS = ("embedding", "lexical")
+
+# Longer sentences (e.g. chunks whose punctuation was stripped) are scored in word windows
+SENTENCE_MAX_WORDS = 40
+
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+|\n+')
+TERM_PATTERN = re.compile(r'[a-z0-9]+')
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "for", "with", "at", "by",
+    "from", "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these",
+    "those", "as", "do", "does", "did", "how", "what", "which", "who", "why", "when", "where",
+    "can", "i", "we", "you", "our", "your"
+}
+
+class SentenceEmbeddingCache:
+    """Bounded LRU cache of sentence embeddings keyed by sentence hash"""
+
+    def __init__(self, max_entries: int = SENTENCE_EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(sentence: str) -> str:
+        return hashlib.sha1(sentence.encode('utf-8')).hexdigest()
+
+    def get_many(self, sentences: List[str]) -> List[List[float]]:
+        """Embed sentences, requesting only the ones not cached yet in one batch"""
+        keys = [self._key(sentence) for sentence in sentences]
+        with self._lock:
+            cached = {key: self._entries[key] for key in keys if key in self._entries}
+            for key in cached:
+                self._entries.move_to_end(key)
+
+        missing = {}
+        for key, sentence in zip(keys, sentences):
+            if key not in cached:
+                missing.setdefault(key, sentence)
+        if missing:
+            embeddings = get_embeddings(list(missing.values()))
+            fetched = dict(zip(missing, embeddings))
+            with self._lock:
+                for key, embedding in fetched.items():
+                    self._entries[key] = embedding
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            cached.update(fetched)
+
+        return [cached[key] for key in keys]
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, breaking overly long ones into word windows"""
+    sentences = []
+    for sentence in SENTENCE_PATTERN.split(text):
+        words = sentence.split()
+        for start in range(0, len(words), SENTENCE_MAX_WORDS):
+            sentences.append(" ".join(words[start:start + SENTENCE_MAX_WORDS]))
+    return sentences
+
+def _terms(text: str) -> List[str]:
+    return [term for term in TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+def lexical_scores(query: str, sentences: List[str]) -> List[float]:
+    """Score sentences by IDF-weighted term overlap with the query"""
+    sentence_terms = [set(_terms(sentence)) for sentence in sentences]
+    document_frequency = {}
+    for terms in sentence_terms:
+        for term in terms:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+
+    query_terms = set(_terms(query))
+    scores = []
+    for terms in sentence_terms:
+        overlap = query_terms & terms
+        weight = sum(math.log(1 + len(sentences) / document_frequency[term]) for term in overlap)
+        scores.append(weight / math.sqrt(len(terms)) if terms else 0.0)
+    return scores
+
+def embedding_scores(query_embedding: Sequence[float], sentences: List[str],
+                     sentence_vectors: Optional[Dict[str, Sequence[float]]] = None) -> List[float]:
+    """Score sentences by cosine similarity of their (cached or given) embeddings to the query embedding"""
+    if sentence_vectors is None:
+        vectors = sentence_embeddings.get_many(sentences)
+    else:
+        vectors = [sentence_vectors[sentence] for sentence in sentences]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    return (vectors @ query).tolist()
+
+def compress_texts(texts: List[str], query: str, query_embedding: Optional[Sequence[float]] = None,
+                   ratio: Optional[float] = None, method: str = "embedding",
+                   sentence_vectors: Optional[Dict[str, Sequence[float]]] = None) -> Dict[str, Any]:
+    """
+    Keep the sentences of texts most relevant to query, up to a fraction of the original tokens
+
+    Args:
+        texts: Passages to compress (e.g. retrieved chunks)
+        query: Question or topic the passages are used for
+        query_embedding: Embedding of query, required for the "embedding" method
+        ratio: Fraction of the original tokens to keep (defaults to COMPRESSION_RATIO)
+        method: "embedding" (falls back to "lexical" on failure) or "lexical"
+        sentence_vectors: Precomputed embeddings of every sentence (see compress_batch)
+
+    Returns:
+        Dictionary with the compressed texts (in input order, sentences in reading order),
+        the method used and the original/compressed token counts
+    """
+    ratio = COMPRESSION_RATIO if ratio is None else ratio
+    sentences = [(position, sentence) for position, text in enumerate(texts) for sentence in split_sentences(text)]
+    original_tokens = sum(estimate_tokens(text) for text in texts)
+
+    if not sentences or ratio >= 1:
+        return {"texts": list(texts), "method": None,
+                "original_tokens": original_tokens, "compressed_tokens": original_tokens}
+
+    sentence_texts = [sentence for _, sentence in sentences]
+    scores = None
+    if method == "embedding" and query_embedding is not None:
+        try:
+            scores = embedding_scores(query_embedding, sentence_texts, sentence_vectors)
+        except Exception as e:
+            logger.warning(f"Embedding-based compression failed, using lexical scoring: {str(e)}")
+    if scores is None:
+        method = "lexical"
+        scores = lexical_scores(query, sentence_texts)
+
+    # Take the best sentences until the token target is met, always keeping at least one
+    target_tokens = max(1, int(original_tokens * ratio))
+    kept = set()
+    kept_tokens = 0
+    for i in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        tokens = estimate_tokens(sentence_texts[i])
+        if kept and kept_tokens + tokens > target_tokens:
+            continue
+        kept.add(i)
+        kept_tokens += tokens
+
+    compressed = [[] for _ in texts]
+    for i, (position, sentence) in enumerate(sentences):
+        if i in kept:
+            compressed[position].append(sentence)
+    compressed_texts = [" ".join(parts) for parts in compressed]
+    compressed_tokens = sum(estimate_tokens(text) for text in compressed_texts)
+
+    logger.info(f"Compressed {original_tokens} tokens to {compressed_tokens} ({method}, "
+                f"{len(kept)}/{len(sentences)} sentences)")
+
+    return {
+        "texts": compressed_texts,
+        "method": method,
+        "original_tokens": original_tokens,
+        "compressed_tokens": compressed_tokens
+    }
+
+def compress_batch(items: List[Tuple[List[str], str, Optional[Sequence[float]]]], ratio: Optional[float] = None,
+                   method: str = "embedding") -> List[Dict[str, Any]]:
+    """
+    Compress several (texts, query, query_embedding) items, embedding the sentences of all of them in one request
+
+    Returns one compress_texts result per item, in order.
+    """
+    sentence_vectors = None
+    if method == "embedding":
+        sentences = list(dict.fromkeys(
+            sentence
+            for texts, _, query_embedding in items if query_embedding is not None
+            for text in texts for sentence in split_sentences(text)
+        ))
+        try:
+            sentence_vectors = dict(zip(sentences, sentence_embeddings.get_many(sentences)))
+        except Exception as e:
+            logger.warning(f"Embedding-based compression failed, using lexical scoring: {str(e)}")
+            method = "lexical"
+
+    return [
+        compress_texts(texts, query, query_embedding, ratio=ratio, method=method, sentence_vectors=sentence_vectors)
+        for texts, query, query_embedding in items
+    ]
+
+# Global sentence embedding cache instance
+sentence_embeddings = SentenceEmbeddingCache()
@@ -0,0 +1,35 @@
+import os
+from typing import List, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Embedding dimension of the index (text-embedding-3-small)
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", 1536))
+
+# Embedding space of the original, untagged namespaces
+DEFAULT_EMBEDDING_ID = "openai/text-embedding-3-small"
+
+class LLMProvider:
+    """Interface for embedding and chat completion backends"""
+
+    name = "base"
+
+    # Identifies the embedding space; vectors from different spaces are never mixed
+    embedding_id = "base"
+
+    # Whether the backend can serve chat completions (embedding-only backends cannot)
+    supports_chat = True
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, preserving input order"""
+        raise NotImplementedError
+
+    def chat(self, messages: List[Dict[str, str]], max_tokens: int = 500,
+             temperature: float = 0.7, model: Optional[str] = None) -> str:
+        """Complete a chat conversation, returning the assistant message"""
+        raise NotImplementedError
+
+    def health_check(self):
+        """Raise if the backend is unreachable"""
+        raise NotImplementedError
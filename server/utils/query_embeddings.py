@@ -0,0 +1,95 @@
+import threading
+import numpy as np
+from typing import Dict, List, Tuple
+
+from .db import get_connection
+from .llm_provider import embedding_provider, get_embeddings
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+class QueryEmbeddingStore:
+    """Embeddings of fixed queries (e.g. flashcard seed topics), persisted on disk per embedding model
+
+    Queries are embedded once per model; later lookups are served from memory or SQLite
+    without calling the embedding provider.
+    """
+
+    def __init__(self):
+        self._memory: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Create the query embeddings table if it does not exist"""
+        with get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    embedding_id TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    PRIMARY KEY (embedding_id, query)
+                )
+            """)
+
+    def _load(self, embedding_id: str, queries: List[str]) -> Dict[str, List[float]]:
+        """Read stored embeddings of queries for a model"""
+        embeddings = {}
+        with get_connection() as conn:
+            for start in range(0, len(queries), LOOKUP_BATCH_SIZE):
+                batch = queries[start:start + LOOKUP_BATCH_SIZE]
+                rows = conn.execute(
+                    f"SELECT query, embedding FROM query_embeddings WHERE embedding_id = ? "
+                    f"AND query IN ({', '.join('?' * len(batch))})",
+                    [embedding_id, *batch]
+                ).fetchall()
+                for row in rows:
+                    embeddings[row["query"]] = np.frombuffer(row["embedding"], dtype=np.float32).tolist()
+        return embeddings
+
+    def _save(self, embedding_id: str, embeddings: Dict[str, List[float]]):
+        """Persist embeddings of queries for a model"""
+        with get_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO query_embeddings (embedding_id, query, embedding) VALUES (?, ?, ?)",
+                [
+                    (embedding_id, query, np.asarray(embedding, dtype=np.float32).tobytes())
+                    for query, embedding in embeddings.items()
+                ]
+            )
+
+    def get_many(self, queries: List[str]) -> List[List[float]]:
+        """Get the embeddings of queries, embedding only the ones never seen for this model in one batch"""
+        embedding_id = embedding_provider.embedding_id
+        with self._lock:
+            found = {query: self._memory[(embedding_id, query)]
+                     for query in queries if (embedding_id, query) in self._memory}
+
+        missing = list(dict.fromkeys(query for query in queries if query not in found))
+        if missing:
+            stored = self._load(embedding_id, missing)
+            missing = [query for query in missing if query not in stored]
+            if missing:
+                embedded = dict(zip(missing, get_embeddings(missing)))
+                self._save(embedding_id, embedded)
+                stored.update(embedded)
+            with self._lock:
+                for query, embedding in stored.items():
+                    self._memory[(embedding_id, query)] = embedding
+            found.update(stored)
+
+        return [found[query] for query in queries]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the number of embeddings held in memory and stored for the current model"""
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS stored FROM query_embeddings WHERE embedding_id = ?",
+                (embedding_provider.embedding_id,)
+            ).fetchone()
+        with self._lock:
+            in_memory = len(self._memory)
+        return {"in_memory": in_memory, "stored": row["stored"]}
+
+# Global query embedding store instance
+query_embeddings = QueryEmbeddingStore()
@@ -0,0 +1,45 @@
+import numpy as np
+from typing import List, Sequence
+
+def mmr_select(query_vector: Sequence[float], candidate_vectors: Sequence[Sequence[float]],
+               k: int, mmr_lambda: float = 0.5) -> List[int]:
+    """
+    Select a relevant but diverse subset of candidates with maximal marginal relevance
+    
+    Args:
+        query_vector: Query embedding
+        candidate_vectors: Candidate embeddings, ordered by retrieval score
+        k: Number of candidates to select
+        mmr_lambda: Trade-off between relevance (1.0) and diversity (0.0)
+    
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    if k <= 0 or len(candidate_vectors) == 0:
+        return []
+    
+    candidates = np.asarray(candidate_vectors, dtype=np.float32)
+    query = np.asarray(query_vector, dtype=np.float32)
+    
+    # Cosine similarity via unit-normalized vectors
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    
+    relevance = candidates @ query
+    max_redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    selected = []
+    
+    for _ in range(min(k, len(candidates))):
+        if selected:
+            scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        max_redundancy = np.maximum(max_redundancy, candidates @ candidates[pick])
+    
+    return selected
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import base64
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+from .db import get_connection
+
+load_dotenv()
+
+# Maximum cached searches and their time-to-live in seconds
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 1000))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 300))
+
+# Live pagination cursors kept and their time-to-live in seconds
+SEARCH_CURSOR_MAX = int(os.getenv("SEARCH_CURSOR_MAX", 500))
+SEARCH_CURSOR_TTL = int(os.getenv("SEARCH_CURSOR_TTL", 300))
+
+class SearchCache:
+    """Bounded LRU cache of search results, invalidated by the knowledge-base generation
+    
+    The generation counter is shared by all worker processes, so an ingest in any
+    worker invalidates every cache on its next lookup.
+    """
+    
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE, ttl: int = SEARCH_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def make_key(query: str, metadata_filter: Optional[Dict[str, Any]], top_k: int,
+                 mode: Dict[str, Any]) -> str:
+        """Build a cache key from the normalized query, filter, top_k and retrieval mode"""
+        normalized_query = " ".join(query.lower().split())
+        return json.dumps([normalized_query, metadata_filter, top_k, mode], sort_keys=True, default=str)
+    
+    def _sync_generation(self, generation: int) -> bool:
+        """Drop every entry once the knowledge base has changed, returning False for a stale generation"""
+        if self._generation is not None and generation < self._generation:
+            return False
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._generation = generation
+        return True
+    
+    def get(self, key: str, generation: int) -> Optional[Any]:
+        """Get a cached result, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key) if self._sync_generation(generation) else None
+            if entry is None or time.time() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: str, generation: int, value: Any):
+        """Cache a result computed at the given generation (ignored if the knowledge base changed since)"""
+        with self._lock:
+            if not self._sync_generation(generation):
+                return
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit ratio"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations
+            }
+
+class SearchCursorStore:
+    """Over-fetched candidate lists of paginated searches, addressed by opaque cursors
+    
+    Cursors are kept in the shared SQLite database, so a later page can be served by
+    any worker process, not only the one that ran the search.
+    """
+    
+    def __init__(self, max_entries: int = SEARCH_CURSOR_MAX, ttl: int = SEARCH_CURSOR_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._ensure_schema()
+    
+    def _ensure_schema(self):
+        """Create the search cursors table if it does not exist"""
+        with get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cursors (
+                    token TEXT PRIMARY KEY,
+                    accessed_at REAL NOT NULL,
+                    search TEXT NOT NULL,
+                    candidates TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cursors_accessed ON search_cursors (accessed_at)")
+    
+    @staticmethod
+    def encode(token: str, offset: int) -> str:
+        """Build the cursor for the page starting at offset"""
+        return base64.urlsafe_b64encode(f"{token}:{offset}".encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def decode(cursor: str):
+        """Split a cursor into its token and offset, or (None, 0) if it is malformed"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            token, offset = base64.urlsafe_b64decode(padded.encode()).decode().rsplit(":", 1)
+            return token, int(offset)
+        except (ValueError, UnicodeDecodeError):
+            return None, 0
+    
+    def create(self, search: Dict[str, Any], candidates: List[Any]) -> str:
+        """Store a search and its ranked candidates, returning the token that addresses them"""
+        token = secrets.token_urlsafe(12)
+        now = time.time()
+        with get_connection() as conn:
+            conn.execute(
+                "INSERT INTO search_cursors (token, accessed_at, search, candidates) VALUES (?, ?, ?, ?)",
+                (token, now, json.dumps(search), json.dumps([list(candidate) for candidate in candidates]))
+            )
+            # Expired cursors and the least recently read ones beyond max_entries are dropped
+            conn.execute("DELETE FROM search_cursors WHERE accessed_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM search_cursors WHERE token NOT IN "
+                "(SELECT token FROM search_cursors ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+        return token
+    
+    def get(self, token: str):
+        """Get the (search, candidates) of a token, or None once it has expired"""
+        now = time.time()
+        with get_connection() as conn:
+            # Each page read keeps the cursor alive for another ttl seconds
+            updated = conn.execute(
+                "UPDATE search_cursors SET accessed_at = ? WHERE token = ? AND accessed_at >= ?",
+                (now, token, now - self.ttl)
+            ).rowcount
+            if not updated:
+                return None
+            row = conn.execute(
+                "SELECT search, candidates FROM search_cursors WHERE token = ?", (token,)
+            ).fetchone()
+        return json.loads(row["search"]), [tuple(candidate) for candidate in json.loads(row["candidates"])]
+
+# Global search cache instances
+search_cache = SearchCache()
+search_cursors = SearchCursorStore()
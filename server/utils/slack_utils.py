@@ -1,10 +1,14 @@
 import os
+import re
 import requests
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Silence (in seconds) that closes a conversation window outside threads
+SLACK_WINDOW_GAP_SECONDS = int(os.getenv("SLACK_WINDOW_GAP_SECONDS", 1800))
+
 class SlackIntegration:
     def __init__(self):
         # Get token from token manager instead of environment
@@ -95,7 +99,8 @@ class SlackIntegration:
                         "content": content,
                         "user": message.get("user", "Unknown"),
                         "timestamp": message["ts"],
-                        "channel_id": channel_id
+                        "channel_id": channel_id,
+                        "thread_ts": message.get("thread_ts")
                     })
             
             return messages
@@ -156,7 +161,8 @@ class SlackIntegration:
                             "content": content,
                             "user": message.get("user", "Unknown"),
                             "timestamp": message["ts"],
-                            "channel_id": channel_id
+                            "channel_id": channel_id,
+                            "thread_ts": message.get("thread_ts")
                         })
                 
                 return messages
@@ -213,6 +219,8 @@ class SlackIntegration:
                             "user": message["user"],
                             "timestamp": message["timestamp"],
                             "channel": channel["name"],
+                            "channel_id": channel["id"],
+                            "thread_ts": message.get("thread_ts"),
                             "permalink": f"slack://channel/{channel['id']}/messages/{message['id']}"
                         })
                 
@@ -264,30 +272,140 @@ class SlackIntegration:
     def _extract_message_content(self, message: Dict[str, Any]) -> str:
         """Extract clean text content from a Slack message"""
         try:
-            content = message.get("text", "")
-            
-            # Remove user mentions
-            import re
-            content = re.sub(r'<@[A-Z0-9]+>', '', content)
-            
-            # Remove channel mentions
-            content = re.sub(r'<#[A-Z0-9]+\|[^>]+>', '', content)
-            
-            # Remove URLs
-            content = re.sub(r'<https?://[^>]+>', '', content)
-            
-            # Remove formatting
-            content = re.sub(r'\*([^*]+)\*', r'\1', content)  # Bold
-            content = re.sub(r'_([^_]+)_', r'\1', content)    # Italic
-            content = re.sub(r'`([^`]+)`', r'\1', content)    # Code
-            
-            # Clean up whitespace
-            content = re.sub(r'\s+', ' ', content).strip()
-            
-            return content
+            return clean_slack_text(message.get("text", ""))
         except:
             return ""
 
+# Slack markup cleanup patterns, applied in order by clean_slack_text
+SLACK_PATTERNS = [
+    (re.compile(r'<@[A-Z0-9]+>'), ''),  # User mentions
+    (re.compile(r'<#[A-Z0-9]+\|[^>]+>'), ''),  # Channel mentions
+    (re.compile(r'<https?://[^>]+>'), ''),  # URLs
+    (re.compile(r'\*([^*]+)\*'), r'\1'),  # Bold
+    (re.compile(r'_([^_]+)_'), r'\1'),  # Italic
+    (re.compile(r'`([^`]+)`'), r'\1'),  # Code
+    (re.compile(r'\s+'), ' '),  # Whitespace
+]
+
+def clean_slack_text(content: str) -> str:
+    """Strip mentions, links and formatting markup from Slack message text"""
+    for pattern, replacement in SLACK_PATTERNS:
+        content = pattern.sub(replacement, content)
+    
+    return content.strip()
+
+def _group_by_channel(messages: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group messages by their channel ID, preserving order"""
+    channels = {}
+    for message in messages:
+        channels.setdefault(message.get("channel_id", ""), []).append(message)
+    return channels
+
+def build_conversation_windows(messages: List[Dict[str, Any]], max_tokens: int = 300,
+                               gap_seconds: int = None) -> List[Dict[str, Any]]:
+    """
+    Group messages of one channel into conversation windows
+    
+    Messages of the same thread (thread_ts) are windowed together; all other
+    messages are split wherever the time between consecutive messages exceeds
+    gap_seconds. Windows are also closed once they reach max_tokens.
+    
+    Args:
+        messages: Cleaned messages with "user", "content" and "timestamp"
+        max_tokens: Token budget per window (same estimate as the chunker)
+        gap_seconds: Silence that starts a new window (defaults to SLACK_WINDOW_GAP_SECONDS)
+    
+    Returns:
+        List of window dictionaries ordered by start time
+    """
+    if gap_seconds is None:
+        gap_seconds = SLACK_WINDOW_GAP_SECONDS
+    
+    # Threads are kept together, everything else is one time-ordered stream
+    groups = {}
+    for message in messages:
+        groups.setdefault(message.get("thread_ts") or "", []).append(message)
+    
+    windows = []
+    for thread_ts, group in groups.items():
+        group.sort(key=lambda m: float(m["timestamp"]))
+        current = []
+        current_chars = 0
+        
+        for message in group:
+            line_length = len(message["user"]) + len(message["content"]) + 4
+            gap_exceeded = (
+                not thread_ts and current
+                and float(message["timestamp"]) - float(current[-1]["timestamp"]) > gap_seconds
+            )
+            over_budget = current and (current_chars + line_length) // 4 > max_tokens
+            
+            if gap_exceeded or over_budget:
+                windows.append(_make_window(current, thread_ts))
+                current = []
+                current_chars = 0
+            
+            current.append(message)
+            current_chars += line_length
+        
+        if current:
+            windows.append(_make_window(current, thread_ts))
+    
+    windows.sort(key=lambda w: float(w["start_ts"]))
+    return windows
+
+def _make_window(messages: List[Dict[str, Any]], thread_ts: str) -> Dict[str, Any]:
+    """Build a conversation window from consecutive messages"""
+    speakers = []
+    for message in messages:
+        if message["user"] not in speakers:
+            speakers.append(message["user"])
+    
+    return {
+        "content": "\n".join(f"[{m['user']}] {m['content']}" for m in messages),
+        "thread_ts": thread_ts,
+        "speakers": speakers,
+        "start_ts": messages[0]["timestamp"],
+        "end_ts": messages[-1]["timestamp"],
+        "message_count": len(messages)
+    }
+
+def _windows_to_items(windows: List[Dict[str, Any]], title: str, source_prefix: str,
+                      item_type: str, snapshot: bool = False) -> List[Dict[str, Any]]:
+    """
+    Turn conversation windows into integration documents
+    
+    With snapshot=True the windows are the complete current view of source_prefix:
+    the documents carry it as "sync_prefix", so sources registered under it by earlier
+    syncs that are no longer produced (shifted window boundaries, messages that fell
+    outside the fetch limit) can be pruned.
+    """
+    items = []
+    for window in windows:
+        if window["thread_ts"]:
+            source = f"{source_prefix}/thread/{window['thread_ts']}"
+        else:
+            source = f"{source_prefix}/window/{window['start_ts']}"
+        
+        item = {
+            "title": f"{title} - {window['message_count']} messages",
+            "content": window["content"],
+            "source": source,
+            "type": item_type,
+            "timestamp": window["end_ts"],
+            "metadata": {
+                "speakers": window["speakers"],
+                "start_ts": window["start_ts"],
+                "end_ts": window["end_ts"],
+                "message_count": window["message_count"],
+                "thread_ts": window["thread_ts"]
+            }
+        }
+        if snapshot:
+            item["sync_prefix"] = source_prefix
+        items.append(item)
+    return items
+
 def get_slack_data(channel_ids: List[str] = None, search_query: str = None, include_dms: bool = False) -> List[Dict[str, Any]]:
     """Get comprehensive Slack data with detailed debugging"""
     try:
@@ -314,14 +432,13 @@ def get_slack_data(channel_ids: List[str] = None, search_query: str = None, incl
                 if len(messages) > 3:
                     print(f"         ... and {len(messages) - 3} more messages")
             
-            for message in messages:
-                data.append({
-                    "title": f"Slack - Channel Message - {message['user']}",
-                    "content": message["content"],
-                    "source": f"slack://channel/{channel_id}/messages/{message['id']}",
-                    "type": "channel_message",
-                    "timestamp": message["timestamp"]
-                })
+            data.extend(_windows_to_items(
+                build_conversation_windows(messages),
+                title=f"Slack - Channel {channel_id}",
+                source_prefix=f"slack://channel/{channel_id}",
+                item_type="channel_message",
+                snapshot=True
+            ))
     
     # Search messages
     if search_query:
@@ -337,14 +454,13 @@ def get_slack_data(channel_ids: List[str] = None, search_query: str = None, incl
             if len(search_results) > 3:
                 print(f"         ... and {len(search_results) - 3} more results")
         
-        for message in search_results:
-            data.append({
-                "title": f"Slack - Search Result - {message['user']}",
-                "content": message["content"],
-                "source": f"slack://search/{message['id']}",
-                "type": "search_result",
-                "timestamp": message["timestamp"]
-            })
+        for channel_id, channel_messages in _group_by_channel(search_results).items():
+            data.extend(_windows_to_items(
+                build_conversation_windows(channel_messages),
+                title=f"Slack - Search Result - #{channel_messages[0]['channel']}",
+                source_prefix=f"slack://search/{channel_id}",
+                item_type="search_result"
+            ))
     
     # Get direct messages
     if include_dms:
@@ -360,14 +476,14 @@ def get_slack_data(channel_ids: List[str] = None, search_query: str = None, incl
             if len(dm_messages) > 3:
                 print(f"         ... and {len(dm_messages) - 3} more messages")
         
-        for message in dm_messages:
-            data.append({
-                "title": f"Slack - Direct Message - {message['user']}",
-                "content": message["content"],
-                "source": f"slack://dm/{message['channel_id']}/messages/{message['id']}",
-                "type": "direct_message",
-                "timestamp": message["timestamp"]
-            })
+        for channel_id, channel_messages in _group_by_channel(dm_messages).items():
+            data.extend(_windows_to_items(
+                build_conversation_windows(channel_messages),
+                title="Slack - Direct Message",
+                source_prefix=f"slack://dm/{channel_id}",
+                item_type="direct_message",
+                snapshot=True
+            ))
     
     # If no specific channels, get from ALL available channels
     if not channel_ids and not search_query and not include_dms:
@@ -404,14 +520,13 @@ def get_slack_data(channel_ids: List[str] = None, search_query: str = None, incl
             total_messages += len(messages)
             all_messages.extend(messages)
             
-            for message in messages:
-                data.append({
-                    "title": f"Slack - {channel['name']} - {message['user']}",
-                    "content": message["content"],
-                    "source": f"slack://channel/{channel['id']}/messages/{message['id']}",
-                    "type": "channel_message",
-                    "timestamp": message["timestamp"]
-                })
+            data.extend(_windows_to_items(
+                build_conversation_windows(messages),
+                title=f"Slack - {channel['name']}",
+                source_prefix=f"slack://channel/{channel['id']}",
+                item_type="channel_message",
+                snapshot=True
+            ))
         
         print(f"   📊 Total messages collected from {len(channels)} channels: {total_messages}")
         
@@ -426,5 +541,5 @@ def get_slack_data(channel_ids: List[str] = None, search_query: str = None, incl
         for i, msg in enumerate(all_messages):
             print(f"      {i+1:3d}. Channel: #{msg['channel_id']} | User: {msg['user']} | Content: {msg['content'][:100]}...")
     
-    print(f"📊 Total Slack data items collected: {len(data)}")
+    print(f"📊 Total Slack conversation windows collected: {len(data)}")
     return data 
\ No newline at end of file
@@ -0,0 +1,87 @@
+from typing import Dict, List, Set
+
+from .db import get_connection
+
+class SourceRegistry:
+    """Track which vector IDs belong to each ingested source, per namespace
+
+    A source has its own vector set in every namespace (e.g. one per embedding provider),
+    so re-ingesting it into one namespace never touches its vectors in another.
+    """
+
+    def __init__(self):
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Create the registry table if it does not exist, migrating older layouts"""
+        with get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS source_vectors (
+                    source TEXT NOT NULL,
+                    vector_id TEXT NOT NULL,
+                    namespace TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (source, namespace, vector_id)
+                )
+            """)
+            # Registries created before namespaces were introduced lack the column
+            columns = {row["name"]: row["pk"] for row in conn.execute("PRAGMA table_info(source_vectors)")}
+            if "namespace" not in columns:
+                conn.execute("ALTER TABLE source_vectors ADD COLUMN namespace TEXT NOT NULL DEFAULT ''")
+                columns["namespace"] = 0
+            # Registries keyed by (source, vector_id) are rebuilt with the namespace in the key
+            if not columns["namespace"]:
+                conn.execute("""
+                    CREATE TABLE source_vectors_rebuilt (
+                        source TEXT NOT NULL,
+                        vector_id TEXT NOT NULL,
+                        namespace TEXT NOT NULL DEFAULT '',
+                        PRIMARY KEY (source, namespace, vector_id)
+                    )
+                """)
+                conn.execute(
+                    "INSERT OR IGNORE INTO source_vectors_rebuilt (source, vector_id, namespace) "
+                    "SELECT source, vector_id, namespace FROM source_vectors"
+                )
+                conn.execute("DROP TABLE source_vectors")
+                conn.execute("ALTER TABLE source_vectors_rebuilt RENAME TO source_vectors")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_source_vectors_namespace ON source_vectors (namespace)")
+
+    def get_vector_ids(self, source: str, namespace: str) -> Set[str]:
+        """Get the vector IDs currently stored for a source in a namespace"""
+        with get_connection() as conn:
+            rows = conn.execute(
+                "SELECT vector_id FROM source_vectors WHERE source = ? AND namespace = ?", (source, namespace)
+            ).fetchall()
+        return {row["vector_id"] for row in rows}
+
+    def get_sources(self, prefix: str, namespace: str) -> List[str]:
+        """Get the sources registered in a namespace whose name starts with prefix"""
+        with get_connection() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT source FROM source_vectors WHERE namespace = ? AND substr(source, 1, ?) = ?",
+                (namespace, len(prefix), prefix)
+            ).fetchall()
+        return [row["source"] for row in rows]
+
+    def get_orphans(self, source: str, vector_ids: List[str], namespace: str) -> Dict[str, List[str]]:
+        """Get IDs stored for a source in namespace that are not part of its new vector set, grouped by namespace"""
+        orphans = sorted(self.get_vector_ids(source, namespace) - set(vector_ids))
+        return {namespace: orphans} if orphans else {}
+
+    def replace_source(self, source: str, vector_ids: List[str], namespace: str):
+        """Record vector_ids as the complete set of vectors for a source in namespace"""
+        with get_connection() as conn:
+            conn.execute("DELETE FROM source_vectors WHERE source = ? AND namespace = ?", (source, namespace))
+            conn.executemany(
+                "INSERT OR IGNORE INTO source_vectors (source, vector_id, namespace) VALUES (?, ?, ?)",
+                [(source, vector_id, namespace) for vector_id in vector_ids]
+            )
+
+    def remove_namespace(self, namespace: str) -> int:
+        """Forget every vector stored in a namespace, returning how many were removed"""
+        with get_connection() as conn:
+            cursor = conn.execute("DELETE FROM source_vectors WHERE namespace = ?", (namespace,))
+        return cursor.rowcount
+
+# Global source registry instance
+source_registry = SourceRegistry()
@@ -0,0 +1,37 @@
+from typing import NamedTuple
+
+# SM-2 defaults: starting ease factor, its floor, and the first two intervals in days
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+FIRST_INTERVAL_DAYS = 1
+SECOND_INTERVAL_DAYS = 6
+
+# Answers graded below this quality (0-5) restart the card's repetitions
+PASSING_QUALITY = 3
+
+class CardSchedule(NamedTuple):
+    """Spaced-repetition state of one card"""
+    ease: float
+    interval_days: int
+    repetitions: int
+
+def review(schedule: CardSchedule, quality: int) -> CardSchedule:
+    """Apply an answer graded quality (0 = blackout, 5 = perfect) to a card's schedule (SM-2)"""
+    quality = max(0, min(5, int(quality)))
+    if quality < PASSING_QUALITY:
+        repetitions = 0
+        interval_days = FIRST_INTERVAL_DAYS
+    else:
+        repetitions = schedule.repetitions + 1
+        if repetitions == 1:
+            interval_days = FIRST_INTERVAL_DAYS
+        elif repetitions == 2:
+            interval_days = SECOND_INTERVAL_DAYS
+        else:
+            interval_days = round(schedule.interval_days * schedule.ease)
+    ease = schedule.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    return CardSchedule(round(max(MIN_EASE, ease), 2), interval_days, repetitions)
+
+def quality_from_correctness(is_correct: bool) -> int:
+    """Grade a plain correct/incorrect answer for callers that do not send a quality"""
+    return 4 if is_correct else 1